@@ -1,48 +1,139 @@
-from constants import UTF_8
+import itertools
+from typing import Sequence, Tuple, Union
+import numpy as np
+from int_loading import read_int_array
 
 
 INPUT_FILE_NAME = "expense_report.txt"
 TARGET = 2020
 
 
+def read_input_file() -> np.ndarray:
+	return read_int_array(INPUT_FILE_NAME)
+
+
+def find_two_sum(numbers: Sequence[int], target: int) -> Union[None, Tuple[int, int]]:
+	seen = set()
+	for number in numbers:
+		if target - number in seen:
+			return target - number, number
+		seen.add(number)
+	return None
+
+
+def find_three_sum(numbers: Sequence[int], target: int) -> Union[None, Tuple[int, int, int]]:
+	sorted_numbers = sorted(numbers)
+	n = len(sorted_numbers)
+	for i in range(n - 2):
+		number_i = sorted_numbers[i]
+		if 3 * number_i > target:
+			break  # everything after this is at least as big
+		low = i + 1
+		high = n - 1
+		while low < high:
+			s = number_i + sorted_numbers[low] + sorted_numbers[high]
+			if s == target:
+				return number_i, sorted_numbers[low], sorted_numbers[high]
+			elif s < target:
+				low += 1
+			else:  # s > target
+				high -= 1
+	return None
+
+
+def find_k_sum_meet_in_middle(numbers: Sequence[int], target: int, k: int) -> Union[None, Tuple[int, ...]]:
+	n = len(numbers)
+	half_k = k // 2
+	# every sum of half_k distinct numbers, and which indices made it
+	half_sums = dict()
+	for indices in itertools.combinations(range(n), half_k):
+		s = sum(numbers[i] for i in indices)
+		half_sums.setdefault(s, list()).append(indices)
+	for other_indices in itertools.combinations(range(n), k - half_k):
+		s = sum(numbers[i] for i in other_indices)
+		for indices in half_sums.get(target - s, []):
+			if set(indices).isdisjoint(other_indices):
+				return tuple(numbers[i] for i in sorted(indices + other_indices))
+	return None
+
+
+def find_two_sum_numpy(numbers: np.ndarray, target: int) -> Union[None, Tuple[int, int]]:
+	sorted_numbers = np.sort(numbers)
+	complements = target - sorted_numbers
+	positions = np.searchsorted(sorted_numbers, complements)
+	positions[positions == len(sorted_numbers)] = 0
+	found = (sorted_numbers[positions] == complements)
+	# a number can only pair with itself if it shows up more than once
+	halves = (2 * sorted_numbers == target)
+	if np.any(halves):
+		found &= ~halves | (np.count_nonzero(halves) > 1)
+	hits = np.flatnonzero(found)
+	if len(hits) == 0:
+		return None
+	number = int(sorted_numbers[hits[0]])
+	return number, target - number
+
+
+def find_three_sum_numpy(numbers: np.ndarray, target: int) -> Union[None, Tuple[int, int, int]]:
+	sorted_numbers = np.sort(numbers)
+	n = len(sorted_numbers)
+	for i in range(n - 2):
+		number_i = int(sorted_numbers[i])
+		if 3 * number_i > target:
+			break
+		rest = sorted_numbers[(i + 1):]
+		complements = (target - number_i) - rest
+		# the rightmost match, so a repeated number can still pair with its twin
+		positions = np.searchsorted(rest, complements, side="right") - 1
+		# only accept partners at a later position, so no number is used twice
+		found = (positions > np.arange(len(rest))) & (rest[positions] == complements)
+		hits = np.flatnonzero(found)
+		if len(hits) > 0:
+			number_j = int(rest[hits[0]])
+			return number_i, number_j, target - number_i - number_j
+	return None
+
+
+def find_k_sum(numbers: Union[Sequence[int], np.ndarray], target: int, k: int) -> Union[None, Tuple[int, ...]]:
+	if k < 1:
+		raise ValueError(f"k must be positive; got {k}")
+	if isinstance(numbers, np.ndarray) and np.issubdtype(numbers.dtype, np.integer):
+		# narrow and unsigned dtypes would wrap around when taking complements
+		if numbers.dtype == np.uint64 and np.any(numbers > np.iinfo(np.int64).max):
+			raise ValueError("numbers too big to fit in an int64")
+		numbers = numbers.astype(np.int64)
+		if k == 2:
+			return find_two_sum_numpy(numbers, target)
+		if k == 3:
+			return find_three_sum_numpy(numbers, target)
+		numbers = numbers.tolist()
+	if k == 1:
+		return (target,) if target in numbers else None
+	if k == 2:
+		return find_two_sum(numbers, target)
+	if k == 3:
+		return find_three_sum(numbers, target)
+	return find_k_sum_meet_in_middle(numbers, target, k)
+
+
+def print_product(found: Union[None, Tuple[int, ...]]):
+	if found is None:
+		print("NO ANSWER")
+		return
+	product = 1
+	for number in found:
+		product *= number
+	print(product)
+
+
 def two_numbers():
 	print("TWO NUMBERS:")
-	all_numbers = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line in in_file:
-			number_str = line.strip()
-			number = int(number_str)
-			for previous_number in all_numbers:
-				if previous_number + number == TARGET:
-					print(previous_number * number)
-					return
-			all_numbers.append(number)
-	print("NO ANSWER")
+	print_product(find_k_sum(read_input_file(), TARGET, 2))
 
 
 def three_numbers():
 	print("THREE NUMBERS:")
-	all_numbers = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line in in_file:
-			number_str = line.strip()
-			number = int(number_str)
-			all_numbers.append(number)
-	n = len(all_numbers)
-	for i in range(n):
-		number_i = all_numbers[i]
-		if number_i > TARGET:
-			continue
-		for j in range(i, n):
-			number_j = all_numbers[j]
-			if number_i + number_j > TARGET:
-				continue
-			for k in range(j, n):
-				number_k = all_numbers[k]
-				if number_i + number_j + number_k == TARGET:
-					print(number_i * number_j * number_k)
-					return
-	print("NO ANSWER")
+	print_product(find_k_sum(read_input_file(), TARGET, 3))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+import random
+import time
+from typing import List, Union
+import numpy as np
+from expense_report import TARGET, find_k_sum
+
+
+N_NUMBERS = {2: 5000, 3: 400}
+N_REPEATS = 3
+SEED = 2020
+
+
+def two_numbers_loops(numbers: List[int], target: int) -> Union[None, int]:
+	# the original line-by-line rescan from expense_report.py
+	all_numbers = list()
+	for number in numbers:
+		for previous_number in all_numbers:
+			if previous_number + number == target:
+				return previous_number * number
+		all_numbers.append(number)
+	return None
+
+
+def three_numbers_loops(numbers: List[int], target: int) -> Union[None, int]:
+	# the original triple loop from expense_report.py
+	n = len(numbers)
+	for i in range(n):
+		number_i = numbers[i]
+		if number_i > target:
+			continue
+		for j in range(i, n):
+			number_j = numbers[j]
+			if number_i + number_j > target:
+				continue
+			for k in range(j, n):
+				number_k = numbers[k]
+				if number_i + number_j + number_k == target:
+					return number_i * number_j * number_k
+	return None
+
+
+def make_numbers(n: int, target: int, k: int) -> List[int]:
+	# the filler is too small to be part of any answer, so the loops have to scan everything
+	# before reaching the only answer, which is planted at the end
+	rng = random.Random(SEED)
+	numbers = [rng.randint(1, target // (2 * k) - 1) for _ in range(n - k)]
+	planted = [target // k] * (k - 1)
+	planted.append(target - sum(planted))
+	return numbers + planted
+
+
+def time_call(f, *args) -> float:
+	best = float("inf")
+	for _ in range(N_REPEATS):
+		time_start = time.time()
+		f(*args)
+		time_end = time.time()
+		best = min(best, time_end - time_start)
+	return best
+
+
+if __name__ == "__main__":
+	for k, loops in [(2, two_numbers_loops), (3, three_numbers_loops)]:
+		n = N_NUMBERS[k]
+		number_list = make_numbers(n, TARGET, k)
+		number_array = np.array(number_list, dtype=np.int64)
+		loops_time = time_call(loops, number_list, TARGET)
+		list_time = time_call(find_k_sum, number_list, TARGET, k)
+		array_time = time_call(find_k_sum, number_array, TARGET, k)
+		print(f"k={k}, n={n}:")
+		print(f"  original loops:    {loops_time:.4f} sec")
+		print(f"  find_k_sum (list):  {list_time:.4f} sec ({loops_time / list_time:.1f}x)")
+		print(f"  find_k_sum (numpy): {array_time:.4f} sec ({loops_time / array_time:.1f}x)")
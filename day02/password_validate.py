@@ -1,10 +1,52 @@
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Tuple
+import numpy as np
 from constants import UTF_8
 
 
 INPUT_FILE_NAME = "passwords.txt"
 PASSWORD_LINE_RE = re.compile(r"([0-9]+)-([0-9]+) (.): (.*)")
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+DASH = ord("-")
+SPACE = ord(" ")
+COLON = ord(":")
+ZERO = ord("0")
+NINE = ord("9")
+MAX_DIGITS = 18  # anything this long always fits in an int64
+FIRST_NON_ASCII = 0x80
+SHARDS_PER_WORKER = 4
+SHARD_BATCH_LINES = 10000
+
+
+class PasswordColumns:
+	# one entry per line in num1/num2/c; the passwords are packed end to end in data,
+	# with password i at data[offsets[i]:offsets[i + 1]]
+	def __init__(self, num1: np.ndarray, num2: np.ndarray, c: np.ndarray, offsets: np.ndarray, data: np.ndarray):
+		self.num1 = num1
+		self.num2 = num2
+		self.c = c
+		self.offsets = offsets
+		self.data = data
+
+	def __len__(self) -> int:
+		return len(self.num1)
+
+	def lengths(self) -> np.ndarray:
+		return np.diff(self.offsets)
+
+
+def parse_password_line(line: str) -> Tuple[int, int, str, str]:
+	match = PASSWORD_LINE_RE.fullmatch(line)
+	num1_str = match.group(1)
+	num1 = int(num1_str)
+	num2_str = match.group(2)
+	num2 = int(num2_str)
+	c = match.group(3)
+	password = match.group(4)
+	return num1, num2, c, password
 
 
 def read_password_file() -> List[Tuple[int, int, str, str]]:
@@ -12,17 +54,77 @@ def read_password_file() -> List[Tuple[int, int, str, str]]:
 	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
 		for line_ in in_file:
 			line = line_.strip()
-			match = PASSWORD_LINE_RE.fullmatch(line)
-			num1_str = match.group(1)
-			num1 = int(num1_str)
-			num2_str = match.group(2)
-			num2 = int(num2_str)
-			c = match.group(3)
-			password = match.group(4)
-			to_return.append((num1, num2, c, password))
+			to_return.append(parse_password_line(line))
 	return to_return
 
 
+def parse_digits(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+	# one pass per digit place, each covering every line at once
+	numbers = np.zeros(len(starts), dtype=np.int64)
+	widths = ends - starts
+	for place in range(int(np.max(widths, initial=0))):
+		has_digit = (place < widths)
+		numbers[has_digit] = numbers[has_digit] * 10 + (buffer[starts[has_digit] + place] - ZERO)
+	return numbers
+
+
+def all_digits(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+	# whether every byte from each start up to its end is a digit, one pass per digit place
+	digits_only = np.ones(len(starts), dtype=bool)
+	widths = ends - starts
+	for place in range(int(np.max(widths, initial=0))):
+		has_digit = (place < widths)
+		digit = buffer[np.where(has_digit, starts + place, 0)]
+		digits_only &= ~has_digit | ((ZERO <= digit) & (digit <= NINE))
+	return digits_only
+
+
+def parse_password_columns(buffer: np.ndarray) -> PasswordColumns:
+	# bytes, not characters, so this only matches the per-line functions on ASCII files
+	non_ascii = np.flatnonzero(buffer >= FIRST_NON_ASCII)
+	if len(non_ascii) > 0:
+		raise ValueError(f"non-ASCII byte at offset {non_ascii[0]}; parse this file line by line instead")
+	line_ends = np.flatnonzero(buffer == NEWLINE)
+	if len(buffer) > 0 and buffer[-1] != NEWLINE:
+		line_ends = np.append(line_ends, len(buffer))
+	line_starts = np.concatenate(([0], line_ends[:-1] + 1)).astype(np.int64)
+	# drop any "\r" from "\r\n" line endings, then any blank lines
+	line_ends = line_ends - (buffer[np.maximum(line_ends - 1, 0)] == CARRIAGE_RETURN)
+	not_blank = (line_ends > line_starts)
+	line_starts = line_starts[not_blank]
+	line_ends = line_ends[not_blank]
+	# the first "-" of each line ends num1, and the first " " after it ends num2, the same way
+	# PASSWORD_LINE_RE does; the character and the password can hold anything, even ":"
+	dashes = np.append(np.flatnonzero(buffer == DASH), len(buffer))
+	dashes = dashes[np.searchsorted(dashes, line_starts)]
+	spaces = np.append(np.flatnonzero(buffer == SPACE), len(buffer))
+	num2_ends = spaces[np.searchsorted(spaces, np.minimum(dashes + 1, len(buffer)))]
+	well_formed = (line_starts < dashes) & (dashes + 1 < num2_ends) & (num2_ends + 4 <= line_ends)
+	well_formed &= (dashes - line_starts <= MAX_DIGITS) & (num2_ends - (dashes + 1) <= MAX_DIGITS)
+	# clamped, since a line that's cut short is already not well formed
+	last_byte = len(buffer) - 1
+	well_formed &= (buffer[np.minimum(num2_ends + 2, last_byte)] == COLON) & (buffer[np.minimum(num2_ends + 3, last_byte)] == SPACE)
+	# lines that are already ill-formed get empty spans, so nothing past them gets read
+	well_formed &= all_digits(buffer, line_starts, np.where(well_formed, dashes, line_starts))
+	well_formed &= all_digits(buffer, dashes + 1, np.where(well_formed, num2_ends, dashes + 1))
+	if not np.all(well_formed):
+		bad_line = int(np.flatnonzero(~well_formed)[0])
+		raise ValueError(f"not a password line: {bytes(buffer[line_starts[bad_line]:line_ends[bad_line]])!r}")
+	num1 = parse_digits(buffer, line_starts, dashes)
+	num2 = parse_digits(buffer, dashes + 1, num2_ends)
+	c = buffer[num2_ends + 1]
+	password_starts = num2_ends + 4
+	lengths = line_ends - password_starts
+	offsets = np.concatenate(([0], np.cumsum(lengths)))
+	# gather every password byte into one contiguous buffer
+	data = buffer[np.repeat(password_starts - offsets[:-1], lengths) + np.arange(offsets[-1])]
+	return PasswordColumns(num1, num2, c, offsets, data)
+
+
+def read_password_columns() -> PasswordColumns:
+	return parse_password_columns(np.fromfile(INPUT_FILE_NAME, dtype=np.uint8))
+
+
 def count_valid_passwords1(password_info: List[Tuple[int, int, str, str]]) -> int:
 	count = 0
 	for min_num, max_num, c, password in password_info:
@@ -42,16 +144,96 @@ def count_valid_passwords2(password_info: List[Tuple[int, int, str, str]]) -> in
 	for num1, num2, c, password in password_info:
 		this_count = 0
 		for num in [num1, num2]:
-			if password[num - 1] == c:
+			# a position past the end of the password can't hold the character
+			if 1 <= num <= len(password) and password[num - 1] == c:
 				this_count += 1
 		if this_count == 1:
 			count += 1
 	return count
 
 
+def count_valid_passwords1_columnar(columns: PasswordColumns) -> int:
+	# count matching characters per password with one compare over all the packed bytes
+	lengths = columns.lengths()
+	matches = (columns.data == np.repeat(columns.c, lengths))
+	running_matches = np.concatenate(([0], np.cumsum(matches)))
+	counts = running_matches[columns.offsets[1:]] - running_matches[columns.offsets[:-1]]
+	return int(np.count_nonzero((columns.num1 <= counts) & (counts <= columns.num2)))
+
+
+def count_valid_passwords2_columnar(columns: PasswordColumns) -> int:
+	if len(columns.data) == 0:
+		return 0  # every password is empty, so no position can hold the character
+	lengths = columns.lengths()
+	this_count = np.zeros(len(columns), dtype=np.int64)
+	for num in [columns.num1, columns.num2]:
+		# a position past the end of the password can't hold the character
+		in_range = (1 <= num) & (num <= lengths)
+		positions = columns.offsets[:-1] + np.where(in_range, num - 1, 0)
+		this_count += in_range & (columns.data[np.minimum(positions, len(columns.data) - 1)] == columns.c)
+	return int(np.count_nonzero(this_count == 1))
+
+
+def find_shard_boundaries(file_name: str, n_shards: int) -> List[Tuple[int, int]]:
+	with open(file_name, "rb") as in_file:
+		file_size = in_file.seek(0, 2)
+		boundaries = [0]
+		for i in range(1, n_shards):
+			# back up one byte so a shard can start right at the beginning of a line
+			in_file.seek(max(file_size * i // n_shards - 1, 0))
+			in_file.readline()
+			boundary = in_file.tell()
+			if boundaries[-1] < boundary < file_size:
+				boundaries.append(boundary)
+		boundaries.append(file_size)
+	return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def count_valid_passwords_shard(file_name: str, start: int, end: int) -> Tuple[int, int]:
+	# only SHARD_BATCH_LINES parsed lines are held at a time, however big the shard is
+	count1 = 0
+	count2 = 0
+	batch = list()
+	with open(file_name, "rb") as in_file:
+		in_file.seek(start)
+		position = start
+		while position < end:
+			line_ = in_file.readline()
+			if len(line_) == 0:
+				break
+			position += len(line_)
+			line = line_.decode(UTF_8).strip()
+			if line == "":
+				continue
+			batch.append(parse_password_line(line))
+			if len(batch) == SHARD_BATCH_LINES:
+				count1 += count_valid_passwords1(batch)
+				count2 += count_valid_passwords2(batch)
+				batch.clear()
+	count1 += count_valid_passwords1(batch)
+	count2 += count_valid_passwords2(batch)
+	return count1, count2
+
+
+def count_valid_passwords_parallel(file_name: str = INPUT_FILE_NAME, n_workers: int = None) -> Tuple[int, int]:
+	if n_workers is None:
+		n_workers = os.cpu_count() or 1
+	# more shards than workers, so one slow shard doesn't leave the other workers idle
+	shards = find_shard_boundaries(file_name, n_workers * SHARDS_PER_WORKER)
+	count1 = 0
+	count2 = 0
+	with ProcessPoolExecutor(max_workers=n_workers) as executor:
+		futures = [executor.submit(count_valid_passwords_shard, file_name, start, end) for start, end in shards]
+		for future in futures:
+			shard_count1, shard_count2 = future.result()
+			count1 += shard_count1
+			count2 += shard_count2
+	return count1, count2
+
+
 if __name__ == "__main__":
-	p_word_info = read_password_file()
-	valid_count = count_valid_passwords1(p_word_info)
+	p_word_columns = read_password_columns()
+	valid_count = count_valid_passwords1_columnar(p_word_columns)
 	print(f"Valid passwords: {valid_count}")
-	valid_count = count_valid_passwords2(p_word_info)
+	valid_count = count_valid_passwords2_columnar(p_word_columns)
 	print(f"Valid passwords: {valid_count}")
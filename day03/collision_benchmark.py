@@ -0,0 +1,29 @@
+import time
+import numpy as np
+from tree_count import count_collision, count_collisions
+
+
+HEIGHT = 200000
+WIDTH = 31
+N_SLOPES = 100
+TREE_DENSITY = 0.2
+SEED = 2020
+
+
+if __name__ == "__main__":
+	rng = np.random.default_rng(SEED)
+	tree_array = rng.random((HEIGHT, WIDTH)) < TREE_DENSITY
+	slope_list = [(int(rng.integers(0, WIDTH)), int(rng.integers(1, 4))) for _ in range(N_SLOPES)]
+	print(f"{HEIGHT}x{WIDTH} grid, {N_SLOPES} slopes:")
+	time_start = time.time()
+	loop_counts = [count_collision(tree_array, c_shift, r_shift) for c_shift, r_shift in slope_list]
+	time_end = time.time()
+	loop_time = time_end - time_start
+	print(f"  count_collision per slope: {loop_time:.4f} sec")
+	time_start = time.time()
+	batch_counts = count_collisions(tree_array, slope_list)
+	time_end = time.time()
+	batch_time = time_end - time_start
+	print(f"  count_collisions batched:  {batch_time:.4f} sec ({loop_time / batch_time:.1f}x)")
+	if batch_counts.tolist() != loop_counts:
+		raise ValueError("batched counts don't match the per-slope counts")
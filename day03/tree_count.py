@@ -1,21 +1,79 @@
+from typing import List, Tuple, Union
 import numpy as np
-from constants import UTF_8
 
 
 INPUT_FILE_NAME = "trees.txt"
+MAX_BATCH_STEPS = 2 ** 24  # keeps the index arrays for one batch of slopes to a few hundred MB
+PACK_BLOCK_ROWS = 2 ** 16
+TREE = ord("#")
+CARRIAGE_RETURN = ord("\r")
 
 
-def read_input_file() -> np.ndarray:
-	all_rows = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line_ in in_file:
-			line = line_.strip()
-			row = np.array([c == "#" for c in line])
-			all_rows.append(row)
-	return np.stack(all_rows)
+class PackedTrees:
+	# the tree grid with 8 cells per byte, one row of bytes per grid row (see np.packbits)
+	def __init__(self, bits: np.ndarray, shape: Tuple[int, int]):
+		self.bits = bits
+		self.shape = shape
 
+	def __getitem__(self, cell: Tuple[int, int]) -> bool:
+		row, col = cell
+		return bool((self.bits[row, col // 8] >> (7 - col % 8)) & 1)
 
-def count_collision(trees: np.ndarray, col_shift: int, row_shift: int) -> int:
+	def look_up(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+		flat_bits = self.bits.ravel()
+		row_bytes = self.bits.shape[1]
+		return ((flat_bits[rows * row_bytes + cols // 8] >> (7 - cols % 8)) & 1).astype(bool)
+
+
+def read_grid_layout() -> Tuple[int, int, int]:
+	# (rows, cols, bytes from one row's start to the next), from the first line and the file size
+	with open(INPUT_FILE_NAME, "rb") as in_file:
+		first_line = in_file.readline()
+		file_size = in_file.seek(0, 2)
+	if not first_line.endswith(b"\n"):
+		return (1 if file_size > 0 else 0), file_size, file_size
+	line_length = len(first_line)
+	width = line_length - 1
+	if width > 0 and first_line[width - 1] == CARRIAGE_RETURN:
+		width -= 1
+	height = (file_size + line_length - width) // line_length  # the last line may not end with a newline
+	return height, width, line_length
+
+
+def rows_view(buffer: np.ndarray, height: int, width: int, line_length: int) -> np.ndarray:
+	# a (rows, cols) view over the raw bytes, skipping the line endings without copying
+	return np.lib.stride_tricks.as_strided(buffer, shape=(height, width), strides=(line_length, 1), writeable=False)
+
+
+def read_input_bytes() -> np.ndarray:
+	height, width, line_length = read_grid_layout()
+	if height == 0:
+		return np.empty((0, 0), dtype=np.uint8)  # np.memmap can't map an empty file
+	return rows_view(np.memmap(INPUT_FILE_NAME, dtype=np.uint8, mode="r"), height, width, line_length)
+
+
+def read_input_file(packed: bool = False) -> Union[np.ndarray, PackedTrees]:
+	if not packed:
+		return read_input_bytes() == TREE
+	# read and pack a block of rows at a time, so neither the file's bytes nor the unpacked grid are ever all in memory at once
+	height, width, line_length = read_grid_layout()
+	bits = np.empty((height, (width + 7) // 8), dtype=np.uint8)
+	with open(INPUT_FILE_NAME, "rb") as in_file:
+		for block_start in range(0, height, PACK_BLOCK_ROWS):
+			block_rows = min(PACK_BLOCK_ROWS, height - block_start)
+			block = np.fromfile(in_file, dtype=np.uint8, count=(block_rows * line_length))
+			cells = rows_view(block, block_rows, width, line_length)
+			bits[block_start:(block_start + block_rows)] = np.packbits(cells == TREE, axis=1)
+	return PackedTrees(bits, (height, width))
+
+
+def look_up_trees(trees: Union[np.ndarray, PackedTrees], rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+	if isinstance(trees, PackedTrees):
+		return trees.look_up(rows, cols)
+	return trees.ravel()[rows * trees.shape[1] + cols]
+
+
+def count_collision(trees: Union[np.ndarray, PackedTrees], col_shift: int, row_shift: int) -> int:
 	count = 0
 	row = 0
 	col = 0
@@ -28,11 +86,39 @@ def count_collision(trees: np.ndarray, col_shift: int, row_shift: int) -> int:
 	return count
 
 
+def count_collisions(trees: Union[np.ndarray, PackedTrees], slopes: List[Tuple[int, int]]) -> np.ndarray:
+	height, width = trees.shape
+	counts = np.zeros(len(slopes), dtype=np.int64)
+	if height == 0:
+		return counts
+	batch_start = 0
+	while batch_start < len(slopes):
+		# gather the visited cells of as many slopes as fit in one batch, then look them all up at once
+		all_rows = list()
+		all_cols = list()
+		slope_starts = list()
+		batch_steps = 0
+		i = batch_start
+		while i < len(slopes) and (i == batch_start or batch_steps < MAX_BATCH_STEPS):
+			col_shift, row_shift = slopes[i]
+			if row_shift < 1:
+				raise ValueError(f"row shift must be positive; got {row_shift}")
+			rows = np.arange(0, height, row_shift, dtype=np.int64)
+			cols = ((rows // row_shift) * col_shift) % width
+			all_rows.append(rows)
+			all_cols.append(cols)
+			slope_starts.append(batch_steps)
+			batch_steps += len(rows)
+			i += 1
+		hits = look_up_trees(trees, np.concatenate(all_rows), np.concatenate(all_cols))
+		counts[batch_start:i] = np.add.reduceat(hits.astype(np.int64), slope_starts)
+		batch_start = i
+	return counts
+
+
 if __name__ == "__main__":
 	tree_array = read_input_file()
-	tree_count = count_collision(tree_array, 3, 1)
-	print("collisions for (3, 1):", tree_count)
-	other_slopes = [(1, 1), (5, 1), (7, 1), (1, 2)]
-	for c_shift, r_shift in other_slopes:
-		tree_count *= count_collision(tree_array, c_shift, r_shift)
-	print("product of all collisions:", tree_count)
+	all_slopes = [(3, 1), (1, 1), (5, 1), (7, 1), (1, 2)]
+	all_tree_counts = count_collisions(tree_array, all_slopes)
+	print("collisions for (3, 1):", all_tree_counts[0])
+	print("product of all collisions:", int(np.prod(all_tree_counts)))
@@ -1,6 +1,8 @@
 import re
-from typing import List
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
 from constants import UTF_8
+from record_reading import iter_records
 
 
 INPUT_FILE_NAME = "passports.txt"
@@ -9,22 +11,34 @@ FIELD_VALUE_RE = re.compile(r"(\S*):(\S*)")
 ALL_DIGITS = "0123456789"
 ALL_HEX_CHARS = ALL_DIGITS + "abcdef"
 ALL_EYE_COLORS = ["amb", "blu", "brn", "gry", "grn", "hzl", "oth"]
+EYE_COLOR_SET = frozenset(ALL_EYE_COLORS)
+MISSING_NUMBER = -1
+# one byte wider than a valid value, so anything too long still shows up as too long
+HCL_DTYPE = "S8"
+PID_DTYPE = "S10"
+ECL_DTYPE = "S4"
+HGT_UNIT_DTYPE = "S2"
+COLUMN_BATCH_SIZE = 100000
+
+
+def parse_number(value: str) -> int:
+	if value is None or not (value.isascii() and value.isdigit()):
+		return MISSING_NUMBER
+	return int(value)
+
+
+def year_in_range(year: str, low: int, high: int) -> bool:
+	return low <= parse_number(year) <= high
 
 
 class Passport:
-	def __init__(self, byr: str = None, iyr: int = None, eyr: int = None, hgt: str = None, hcl: str = None, ecl: str = None, pid: str = None, cid: str = None):
-		if byr is None:
-			self.byr = byr
-		else:
-			self.byr = int(byr)
-		if iyr is None:
-			self.iyr = iyr
-		else:
-			self.iyr = int(iyr)
-		if eyr is None:
-			self.eyr = eyr
-		else:
-			self.eyr = int(eyr)
+	# fields stay as the raw strings from the file, and only get converted while validating
+	__slots__ = ("byr", "iyr", "eyr", "hgt", "hcl", "ecl", "pid", "cid")
+
+	def __init__(self, byr: str = None, iyr: str = None, eyr: str = None, hgt: str = None, hcl: str = None, ecl: str = None, pid: str = None, cid: str = None):
+		self.byr = byr
+		self.iyr = iyr
+		self.eyr = eyr
 		self.hgt = hgt
 		self.hcl = hcl
 		self.ecl = ecl
@@ -32,58 +46,37 @@ class Passport:
 		self.cid = cid
 
 	def is_valid(self) -> bool:
-		if self.byr is None:
-			return False
-		if not (1920 <= self.byr <= 2002):
+		# cheapest checks first: missing fields, then lengths and lookups, then anything that parses numbers
+		if self.byr is None or self.iyr is None or self.eyr is None or self.hgt is None or self.hcl is None or self.ecl is None or self.pid is None:
 			return False
 
-		if self.iyr is None:
+		if self.ecl not in EYE_COLOR_SET:
+			return False
+		if len(self.pid) != 9:
 			return False
-		if not (2010 <= self.iyr <= 2020):
+		if len(self.hcl) != 7 or self.hcl[0] != "#":
 			return False
 
-		if self.eyr is None:
+		if not year_in_range(self.byr, 1920, 2002):
 			return False
-		if not (2020 <= self.eyr <= 2030):
+		if not year_in_range(self.iyr, 2010, 2020):
 			return False
-
-		if self.hgt is None:
+		if not year_in_range(self.eyr, 2020, 2030):
 			return False
+
+		height = parse_number(self.hgt[:-2])
 		if self.hgt.endswith("cm"):
-			num_str = self.hgt[:-2]
-			num = int(num_str)
-			if not (150 <= num <= 193):
+			if not (150 <= height <= 193):
 				return False
 		elif self.hgt.endswith("in"):
-			num_str = self.hgt[:-2]
-			num = int(num_str)
-			if not (59 <= num <= 76):
+			if not (59 <= height <= 76):
 				return False
 		else:
 			return False
 
-		if self.hcl is None:
-			return False
-		if len(self.hcl) == 0:
-			return False
-		if self.hcl[0] != "#":
-			return False
-		remaining = self.hcl[1:]
-		if len(remaining) != 6:
-			return False
-		for c in remaining:
+		for c in self.hcl[1:]:
 			if c not in ALL_HEX_CHARS:
 				return False
-
-		if self.ecl is None:
-			return False
-		if self.ecl not in ALL_EYE_COLORS:
-			return False
-
-		if self.pid is None:
-			return False
-		if len(self.pid) != 9:
-			return False
 		for c in self.pid:
 			if c not in ALL_DIGITS:
 				return False
@@ -91,28 +84,88 @@ class Passport:
 		return True
 
 
+def parse_fields(passport_text: str) -> Dict[str, str]:
+	fields = dict()
+	for match in FIELD_VALUE_RE.finditer(passport_text):
+		field = match.group(1)
+		value = match.group(2)
+		fields[field] = value
+	return fields
+
+
 def read_input_file() -> List[Passport]:
-	all_lines = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line in in_file:
-			all_lines.append(line)
-	file_contents = "".join(all_lines)
-	passport_texts = file_contents.split("\n\n")
 	passports = list()
-	for passport_text in passport_texts:
-		fields = dict()
-		for match in FIELD_VALUE_RE.finditer(passport_text):
-			field = match.group(1)
-			value = match.group(2)
-			fields[field] = value
-		passports.append(Passport(**fields))
+	for passport_text in iter_records(INPUT_FILE_NAME):
+		passports.append(Passport(**parse_fields(passport_text)))
 	return passports
 
 
+class PassportColumns:
+	# one entry per passport in every column; numbers are MISSING_NUMBER when absent or not a number,
+	# and text fields are fixed-width bytes, empty when absent
+	def __init__(self, all_fields: List[Dict[str, str]]):
+		self.byr = np.array([parse_number(fields.get("byr")) for fields in all_fields], dtype=np.int64)
+		self.iyr = np.array([parse_number(fields.get("iyr")) for fields in all_fields], dtype=np.int64)
+		self.eyr = np.array([parse_number(fields.get("eyr")) for fields in all_fields], dtype=np.int64)
+		hgt = [fields.get("hgt", "") for fields in all_fields]
+		self.hgt_value = np.array([parse_number(h[:-2]) for h in hgt], dtype=np.int64)
+		self.hgt_unit = np.array([h[-2:].encode(UTF_8) for h in hgt], dtype=HGT_UNIT_DTYPE)
+		self.hcl = np.array([fields.get("hcl", "").encode(UTF_8) for fields in all_fields], dtype=HCL_DTYPE)
+		self.ecl = np.array([fields.get("ecl", "").encode(UTF_8) for fields in all_fields], dtype=ECL_DTYPE)
+		self.pid = np.array([fields.get("pid", "").encode(UTF_8) for fields in all_fields], dtype=PID_DTYPE)
+
+	def __len__(self) -> int:
+		return len(self.byr)
+
+
+def read_passport_columns() -> PassportColumns:
+	return PassportColumns([parse_fields(passport_text) for passport_text in iter_records(INPUT_FILE_NAME)])
+
+
+def iter_passport_columns(batch_size: int = COLUMN_BATCH_SIZE, memory_mapped: bool = False) -> Iterator[PassportColumns]:
+	# only batch_size passports are held at a time
+	batch = list()
+	for passport_text in iter_records(INPUT_FILE_NAME, memory_mapped):
+		batch.append(parse_fields(passport_text))
+		if len(batch) == batch_size:
+			yield PassportColumns(batch)
+			batch = list()
+	if len(batch) > 0:
+		yield PassportColumns(batch)
+
+
+def bytes_in(chars: np.ndarray, allowed: str) -> np.ndarray:
+	return np.isin(chars, np.frombuffer(allowed.encode(UTF_8), dtype=np.uint8))
+
+
+def validate_passport_columns(columns: PassportColumns) -> np.ndarray:
+	valid = (1920 <= columns.byr) & (columns.byr <= 2002)
+	valid &= (2010 <= columns.iyr) & (columns.iyr <= 2020)
+	valid &= (2020 <= columns.eyr) & (columns.eyr <= 2030)
+
+	is_cm = (columns.hgt_unit == b"cm")
+	is_in = (columns.hgt_unit == b"in")
+	valid &= (is_cm & (150 <= columns.hgt_value) & (columns.hgt_value <= 193)) | (is_in & (59 <= columns.hgt_value) & (columns.hgt_value <= 76))
+
+	# view each fixed-width text field as a (passports, bytes) matrix; unused bytes are zero
+	hcl_bytes = columns.hcl.view(np.uint8).reshape(len(columns), columns.hcl.itemsize)
+	valid &= (hcl_bytes[:, 0] == ord("#")) & np.all(bytes_in(hcl_bytes[:, 1:7], ALL_HEX_CHARS), axis=1) & (hcl_bytes[:, 7] == 0)
+
+	valid &= np.isin(columns.ecl, np.array([color.encode(UTF_8) for color in ALL_EYE_COLORS], dtype=ECL_DTYPE))
+
+	pid_bytes = columns.pid.view(np.uint8).reshape(len(columns), columns.pid.itemsize)
+	valid &= np.all(bytes_in(pid_bytes[:, :9], ALL_DIGITS), axis=1) & (pid_bytes[:, 9] == 0)
+	return valid
+
+
+def count_valid_passports(columns: PassportColumns) -> Tuple[int, np.ndarray]:
+	valid = validate_passport_columns(columns)
+	return int(np.count_nonzero(valid)), valid
+
+
 if __name__ == "__main__":
-	all_passports = read_input_file()
 	valid_count = 0
-	for p in all_passports:
-		if p.is_valid():
-			valid_count += 1
+	for passport_batch in iter_passport_columns():
+		batch_count, _ = count_valid_passports(passport_batch)
+		valid_count += batch_count
 	print("valid passports:", valid_count)
@@ -1,5 +1,6 @@
 import math
-from typing import List, Set, Tuple
+from typing import List, Tuple
+import numpy as np
 from constants import UTF_8
 
 
@@ -8,64 +9,111 @@ INPUT_FILE_NAME = "boarding_passes.txt"
 N_ROWS = 128
 N_COLS = 8
 ROW_DIVISIONS = int(math.log2(N_ROWS))
+COL_DIVISIONS = int(math.log2(N_COLS))
+PASS_LENGTH = ROW_DIVISIONS + COL_DIVISIONS
+# a pass is just a binary number: F and L are 0 bits, B and R are 1 bits
+SEAT_TRANSLATION = str.maketrans("FBLR", "0101")
+ONE_BYTES = np.frombuffer(b"BR", dtype=np.uint8)
 
 
-def read_input_file() -> List[str]:
+def read_input_file() -> np.ndarray:
 	all_lines = list()
 	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
 		for line in in_file:
 			all_lines.append(line.strip())
-	return all_lines
-
-
-def seat_string_to_coord(seat_string: str) -> Tuple[int, int]:
-	min_row = 0
-	max_row = N_ROWS
-	row_str = seat_string[:ROW_DIVISIONS]
-	for c in row_str:
-		half_mark = min_row + (max_row - min_row) // 2
-		if c == "F":
-			max_row = half_mark
-		else:
-			min_row = half_mark
-	min_col = 0
-	max_col = N_COLS
-	col_str = seat_string[ROW_DIVISIONS:]
-	for c in col_str:
-		half_mark = min_col + (max_col - min_col) // 2
-		if c == "L":
-			max_col = half_mark
-		else:
-			min_col = half_mark
-	return min_row, min_col
+	return seat_strings_to_matrix(all_lines)
+
+
+def seat_strings_to_matrix(seat_strings: List[str], pass_length: int = PASS_LENGTH) -> np.ndarray:
+	# one row of pass_length bytes per pass
+	passes = np.array([seat_string.encode(UTF_8) for seat_string in seat_strings], dtype=f"S{pass_length}")
+	return passes.view(np.uint8).reshape(len(seat_strings), pass_length)
+
+
+def seat_string_to_int(seat_string: str) -> int:
+	return int(seat_string.translate(SEAT_TRANSLATION), 2)
+
+
+def seat_string_to_coord(seat_string: str, col_divisions: int = COL_DIVISIONS) -> Tuple[int, int]:
+	seat_int = seat_string_to_int(seat_string)
+	return seat_int >> col_divisions, seat_int & ((1 << col_divisions) - 1)
 
 
 def seat_coord_to_int(row: int, col: int) -> int:
 	return (row * N_COLS) + col
 
 
-def get_all_seat_numbers(seat_strings: List[str]) -> Set[int]:
-	seat_numbers = set()
-	for seat_string in seat_strings:
-		r, c = seat_string_to_coord(seat_string)
-		seat_int = seat_coord_to_int(r, c)
-		seat_numbers.add(seat_int)
-	return seat_numbers
+def seat_matrix_to_ints(seat_passes: np.ndarray) -> np.ndarray:
+	pass_length = seat_passes.shape[1]
+	if pass_length > 62:
+		raise ValueError(f"passes of length {pass_length} don't fit in an int64")
+	place_values = 2 ** np.arange(pass_length - 1, -1, -1, dtype=np.int64)
+	return np.isin(seat_passes, ONE_BYTES).astype(np.int64) @ place_values
+
+
+def get_all_seat_numbers(seat_passes: np.ndarray) -> np.ndarray:
+	# seat_map[seat_number] is True for every seat with a pass
+	seat_map = np.zeros(N_ROWS * N_COLS, dtype=bool)
+	seat_map[seat_matrix_to_ints(seat_passes)] = True
+	return seat_map
+
+
+def find_missing_seat_numbers(seat_map: np.ndarray) -> np.ndarray:
+	# every empty seat with an occupied seat on both sides
+	gaps = ~seat_map[1:-1] & seat_map[:-2] & seat_map[2:]
+	return np.flatnonzero(gaps) + 1
+
+
+def find_missing_seat_number(seat_map: np.ndarray, max_number: int) -> int:
+	missing = find_missing_seat_numbers(seat_map[:max_number])
+	if len(missing) == 0:
+		return -1
+	return int(missing[0])
+
+
+class SeatMap:
+	# which seats are taken, for any cabin whose rows and columns are both powers of 2
+	def __init__(self, n_rows: int = N_ROWS, n_cols: int = N_COLS):
+		for n in [n_rows, n_cols]:
+			if n < 1 or n & (n - 1) != 0:
+				raise ValueError(f"cabin dimensions must be powers of 2; got {n_rows}x{n_cols}")
+		self.n_rows = n_rows
+		self.n_cols = n_cols
+		self.pass_length = int(math.log2(n_rows)) + int(math.log2(n_cols))
+		self.occupied = np.zeros(n_rows * n_cols, dtype=bool)
+		self.running_counts = None  # built on the first range query, dropped whenever a seat changes
+
+	def add_passes(self, seat_passes: np.ndarray):
+		if seat_passes.shape[1] != self.pass_length:
+			raise ValueError(f"expected passes of length {self.pass_length}; got {seat_passes.shape[1]}")
+		self.occupied[seat_matrix_to_ints(seat_passes)] = True
+		self.running_counts = None
+
+	def max_seat_number(self) -> int:
+		taken = np.flatnonzero(self.occupied)
+		if len(taken) == 0:
+			return -1
+		return int(taken[-1])
+
+	def find_missing_seats(self) -> np.ndarray:
+		return find_missing_seat_numbers(self.occupied)
 
+	def count_occupied(self, start: int, end: int) -> int:
+		# how many seats in [start, end) are taken
+		if self.running_counts is None:
+			self.running_counts = np.concatenate(([0], np.cumsum(self.occupied)))
+		start = min(max(start, 0), len(self.occupied))
+		end = min(max(end, start), len(self.occupied))
+		return int(self.running_counts[end] - self.running_counts[start])
 
-def find_missing_seat_number(seat_numbers: Set[int], max_number: int) -> int:
-	for possible_number in range(1, max_number - 1):
-		if possible_number in seat_numbers:
-			continue
-		if possible_number - 1 in seat_numbers and possible_number + 1 in seat_numbers:
-			return possible_number
-	return -1
+	def is_range_full(self, start: int, end: int) -> bool:
+		return self.count_occupied(start, end) == max(end - start, 0)
 
 
 if __name__ == "__main__":
-	input_lines = read_input_file()
-	seat_number_set = get_all_seat_numbers(input_lines)
-	max_seat_number = max(seat_number_set)
+	input_passes = read_input_file()
+	seat_number_map = get_all_seat_numbers(input_passes)
+	max_seat_number = int(np.flatnonzero(seat_number_map)[-1])
 	print("biggest seat number:", max_seat_number)
-	missing_seat = find_missing_seat_number(seat_number_set, max_seat_number)
+	missing_seat = find_missing_seat_number(seat_number_map, max_seat_number)
 	print("your seat number:", missing_seat)
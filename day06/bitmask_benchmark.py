@@ -0,0 +1,46 @@
+import time
+import numpy as np
+from customs_counter import count_declarations, count_everyone_declarations, count_groups_everyone
+
+
+N_GROUPS = 10 ** 7
+N_BASELINE_GROUPS = 10 ** 5  # the set-based version is too slow to run on all N_GROUPS
+MAX_GROUP_SIZE = 5
+SEED = 2020
+
+
+def masks_to_groups(person_masks: np.ndarray, group_starts: np.ndarray, n_groups: int):
+	groups = list()
+	group_ends = np.append(group_starts[1:], len(person_masks))
+	for start, end in zip(group_starts[:n_groups], group_ends[:n_groups]):
+		groups.append(["".join(chr(ord("a") + b) for b in range(26) if (mask >> b) & 1) for mask in person_masks[start:end].tolist()])
+	return groups
+
+
+if __name__ == "__main__":
+	rng = np.random.default_rng(SEED)
+	group_sizes = rng.integers(1, MAX_GROUP_SIZE + 1, size=N_GROUPS)
+	all_group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+	# every question is answered by half the people, and everyone answers at least one
+	all_person_masks = rng.integers(1, 1 << 26, size=int(np.sum(group_sizes)), dtype=np.uint32)
+	baseline_groups = masks_to_groups(all_person_masks, all_group_starts, N_BASELINE_GROUPS)
+
+	time_start = time.time()
+	set_count = sum(count_declarations(group) for group in baseline_groups)
+	time_end = time.time()
+	set_time = (time_end - time_start) / N_BASELINE_GROUPS
+	time_start = time.time()
+	int_count = sum(count_everyone_declarations(group) for group in baseline_groups)
+	time_end = time.time()
+	int_time = (time_end - time_start) / N_BASELINE_GROUPS
+	if int_count != set_count:
+		raise ValueError("bitmask counts don't match the set counts")
+	time_start = time.time()
+	count_groups_everyone(all_person_masks, all_group_starts)
+	time_end = time.time()
+	numpy_time = (time_end - time_start) / N_GROUPS
+
+	print(f"time per million groups ({N_GROUPS} groups, {N_BASELINE_GROUPS} for the per-group versions):")
+	print(f"  sets:          {set_time * 10 ** 6:.4f} sec")
+	print(f"  int bitmasks:  {int_time * 10 ** 6:.4f} sec ({set_time / int_time:.1f}x)")
+	print(f"  numpy reduce:  {numpy_time * 10 ** 6:.4f} sec ({set_time / numpy_time:.1f}x)")
@@ -1,18 +1,19 @@
-from typing import List
-from constants import UTF_8
+from typing import Iterator, List, Tuple
+import numpy as np
+from record_reading import iter_record_chunks, iter_records
 
 
 INPUT_FILE_NAME = "customs_declarations.txt"
+FIRST_LETTER = ord("a")
+LAST_LETTER = ord("z")
+NEWLINE = ord("\n")
+CHUNK_BYTES = 2 * 1024 * 1024
+LETTER_BITS = {chr(FIRST_LETTER + i): 1 << i for i in range(26)}  # bit 0 is "a", bit 25 is "z"
 
 
-def read_input_file() -> List[List[str]]:
-	all_lines = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line in in_file:
-			all_lines.append(line)
-	file_contents = "".join(all_lines)
-	group_declarations = file_contents.split("\n\n")
-	return [group_declaration.split("\n") for group_declaration in group_declarations]
+def read_input_file(memory_mapped: bool = False) -> Iterator[List[str]]:
+	for group_declaration in iter_records(INPUT_FILE_NAME, memory_mapped):
+		yield group_declaration.split("\n")
 
 
 def count_declarations(group_declarations_: List[str]) -> int:
@@ -31,10 +32,82 @@ def count_declarations(group_declarations_: List[str]) -> int:
 	return len(letters)
 
 
+def declaration_to_mask(declaration: str) -> int:
+	mask = 0
+	for c in declaration:
+		mask |= LETTER_BITS[c]
+	return mask
+
+
+def group_to_masks(group_declarations: List[str]) -> Tuple[int, int]:
+	# (questions anyone answered, questions everyone answered)
+	anyone = 0
+	everyone = (1 << 26) - 1
+	for declaration in group_declarations:
+		if declaration == "":
+			continue
+		mask = declaration_to_mask(declaration)
+		anyone |= mask
+		everyone &= mask
+	if anyone == 0:
+		everyone = 0  # nobody in the group
+	return anyone, everyone
+
+
+def count_anyone_declarations(group_declarations: List[str]) -> int:
+	anyone, _ = group_to_masks(group_declarations)
+	return anyone.bit_count()
+
+
+def count_everyone_declarations(group_declarations: List[str]) -> int:
+	_, everyone = group_to_masks(group_declarations)
+	return everyone.bit_count()
+
+
+def parse_mask_arrays(buffer: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+	# one mask per person, plus the index of each group's first person
+	is_newline = (buffer == NEWLINE)
+	line_of_byte = np.cumsum(is_newline, dtype=np.int32) - is_newline  # chunks stay well under 2 GB
+	letter_positions = np.flatnonzero((buffer >= FIRST_LETTER) & (buffer <= LAST_LETTER))
+	if len(letter_positions) == 0:
+		return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+	bits = np.left_shift(np.uint32(1), (buffer[letter_positions] - FIRST_LETTER).astype(np.uint32))
+	letter_lines = line_of_byte[letter_positions]
+	line_starts = np.flatnonzero(np.diff(letter_lines, prepend=-1) != 0)
+	person_masks = np.bitwise_or.reduceat(bits, line_starts)
+	# a group starts at the first person, and wherever a blank line was skipped
+	person_lines = letter_lines[line_starts]
+	group_starts = np.flatnonzero(np.diff(person_lines, prepend=-2) > 1)
+	return person_masks, group_starts
+
+
+def iter_mask_arrays(file_name: str = INPUT_FILE_NAME, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+	# parse_mask_arrays for one chunk of whole groups at a time, so memory stays bounded
+	for chunk in iter_record_chunks(file_name, chunk_bytes):
+		yield parse_mask_arrays(np.frombuffer(chunk, dtype=np.uint8))
+
+
+def count_bits(masks: np.ndarray) -> int:
+	return int(np.count_nonzero(np.unpackbits(masks.astype(np.uint32).view(np.uint8))))
+
+
+def count_groups_anyone(person_masks: np.ndarray, group_starts: np.ndarray) -> int:
+	if len(person_masks) == 0:
+		return 0
+	return count_bits(np.bitwise_or.reduceat(person_masks, group_starts))
+
+
+def count_groups_everyone(person_masks: np.ndarray, group_starts: np.ndarray) -> int:
+	if len(person_masks) == 0:
+		return 0
+	return count_bits(np.bitwise_and.reduceat(person_masks, group_starts))
+
+
 if __name__ == "__main__":
-	all_groups = read_input_file()
-	count = 0
-	for group in all_groups:
-		this_count = count_declarations(group)
-		count += this_count
-	print("sum of all group declarations:", count)
+	anyone_total = 0
+	everyone_total = 0
+	for person_masks_, group_starts_ in iter_mask_arrays():
+		anyone_total += count_groups_anyone(person_masks_, group_starts_)
+		everyone_total += count_groups_everyone(person_masks_, group_starts_)
+	print("sum of questions anyone answered:", anyone_total)
+	print("sum of all group declarations:", everyone_total)
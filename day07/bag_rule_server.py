@@ -0,0 +1,166 @@
+import asyncio
+import os
+import stat
+import sys
+from typing import Dict, Iterable, Set
+from constants import UTF_8
+from russian_nesting_bags import build_containing_graph, parse_rule, read_input_file
+
+
+# one command per line, one response line per command:
+#   contains <color>     -> OK <number of colors that can contain it>
+#   inner <color>        -> OK <number of bags inside it>
+#   add <full rule line> -> OK (replaces any rule for that color)
+#   remove <color>       -> OK
+# anything that goes wrong is answered with ERROR <message> instead
+CONTAINS = "contains"
+INNER = "inner"
+ADD = "add"
+REMOVE = "remove"
+
+
+class BagRuleService:
+	def __init__(self, rules: Dict[str, Dict[str, int]], colors: Set[str]):
+		self.rules = rules
+		self.containing_graph = build_containing_graph(rules, colors)
+		self.inner_cache = dict()
+		self.containing_cache = dict()
+
+	def reachable(self, color: str, graph: Dict[str, Iterable[str]]) -> Set[str]:
+		# every color reachable from color, not counting color itself
+		visited = set()
+		to_visit = [color]
+		while len(to_visit) > 0:
+			for neighbor in graph.get(to_visit.pop(), ()):
+				if neighbor not in visited:
+					visited.add(neighbor)
+					to_visit.append(neighbor)
+		visited.discard(color)
+		return visited
+
+	def containing_count(self, color: str) -> int:
+		if color not in self.containing_graph:
+			raise KeyError(f"unknown color: {color}")
+		if color not in self.containing_cache:
+			self.containing_cache[color] = len(self.reachable(color, self.containing_graph))
+		return self.containing_cache[color]
+
+	def inner_count(self, color: str) -> int:
+		if color not in self.containing_graph:
+			raise KeyError(f"unknown color: {color}")
+		# post-order without recursion; a color seen again while it's still open means a cycle
+		open_colors = set()
+		to_visit = [(color, False)]
+		while len(to_visit) > 0:
+			this_color, inner_done = to_visit.pop()
+			if this_color in self.inner_cache:
+				continue
+			inner_colors = self.rules.get(this_color, dict())
+			if inner_done:
+				total = 0
+				for inner_color, count in inner_colors.items():
+					total += count * (1 + self.inner_cache[inner_color])
+				self.inner_cache[this_color] = total
+				open_colors.discard(this_color)
+				continue
+			if this_color in open_colors:
+				raise ValueError(f"bag rules contain a cycle through {this_color}")
+			open_colors.add(this_color)
+			to_visit.append((this_color, True))
+			for inner_color in inner_colors:
+				if inner_color not in self.inner_cache:
+					to_visit.append((inner_color, False))
+		return self.inner_cache[color]
+
+	def forget_if_unused(self, color: str):
+		if color not in self.rules and len(self.containing_graph.get(color, ())) == 0:
+			self.containing_graph.pop(color, None)  # nothing mentions this color anymore
+			self.inner_cache.pop(color, None)
+			self.containing_cache.pop(color, None)
+
+	def set_rule(self, color: str, inner_colors: Dict[str, int]):
+		old_descendants = self.reachable(color, self.rules)
+		old_inner_colors = self.rules.get(color, dict())
+		for inner_color in old_inner_colors:
+			self.containing_graph[inner_color].discard(color)
+		self.containing_graph.setdefault(color, set())
+		for inner_color in inner_colors:
+			self.containing_graph.setdefault(inner_color, set()).add(color)
+		self.rules[color] = inner_colors
+		# only color and the colors that can hold it have different totals now,
+		# and only the colors it held before or holds now have different containing counts
+		for changed_color in self.reachable(color, self.containing_graph) | {color}:
+			self.inner_cache.pop(changed_color, None)
+		for changed_color in old_descendants | self.reachable(color, self.rules):
+			self.containing_cache.pop(changed_color, None)
+		for inner_color in old_inner_colors:
+			self.forget_if_unused(inner_color)
+
+	def remove_rule(self, color: str):
+		if color not in self.rules:
+			raise KeyError(f"no rule for color: {color}")
+		self.set_rule(color, dict())
+		del self.rules[color]
+		self.forget_if_unused(color)
+
+	def handle_command(self, line: str) -> str:
+		command, _, argument = line.strip().partition(" ")
+		try:
+			if command == CONTAINS:
+				return f"OK {self.containing_count(argument)}"
+			elif command == INNER:
+				return f"OK {self.inner_count(argument)}"
+			elif command == ADD:
+				color, inner_colors = parse_rule(argument)
+				self.set_rule(color, inner_colors)
+				return "OK"
+			elif command == REMOVE:
+				self.remove_rule(argument)
+				return "OK"
+			else:
+				return f"ERROR unknown command: {command}"
+		except (KeyError, ValueError) as e:
+			return f"ERROR {e.args[0]}"
+
+
+async def serve_connection(service: BagRuleService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+	while True:
+		line = await reader.readline()
+		if len(line) == 0:
+			break
+		writer.write((service.handle_command(line.decode(UTF_8)) + "\n").encode(UTF_8))
+		await writer.drain()
+	writer.close()
+
+
+async def serve_stdin(service: BagRuleService):
+	loop = asyncio.get_running_loop()
+	stdin_mode = os.fstat(sys.stdin.fileno()).st_mode
+	if stat.S_ISFIFO(stdin_mode) or stat.S_ISSOCK(stdin_mode) or stat.S_ISCHR(stdin_mode):
+		reader = asyncio.StreamReader()
+		await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+		read_line = reader.readline
+	else:
+		# connect_read_pipe won't take a regular file, so read it on a worker thread instead
+		async def read_line() -> bytes:
+			return await loop.run_in_executor(None, sys.stdin.buffer.readline)
+	while True:
+		line = await read_line()
+		if len(line) == 0:
+			break
+		print(service.handle_command(line.decode(UTF_8)), flush=True)
+
+
+async def serve_socket(service: BagRuleService, socket_path: str):
+	server = await asyncio.start_unix_server(lambda r, w: serve_connection(service, r, w), path=socket_path)
+	async with server:
+		await server.serve_forever()
+
+
+if __name__ == "__main__":
+	# with a socket path, answer every client that connects to it; otherwise answer stdin
+	bag_service = BagRuleService(*read_input_file())
+	if len(sys.argv) > 1:
+		asyncio.run(serve_socket(bag_service, sys.argv[1]))
+	else:
+		asyncio.run(serve_stdin(bag_service))
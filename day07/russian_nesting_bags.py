@@ -1,32 +1,42 @@
 import re
-from typing import Dict, Set, Tuple
+from typing import Dict, List, Set, Tuple
+import numpy as np
 from constants import UTF_8
 
 
 INPUT_FILE_NAME = "bag_rules.txt"
 
 FULL_BAG_RULE_RE = re.compile(r"(.*) bags contain (.*)\.")
-ONE_COLOR_RE = re.compile(r"([0-9])+ (.*) bags?")
+ONE_COLOR_RE = re.compile(r"([0-9]+) (.*) bags?")
 TARGET_COLOR = "shiny gold"
 
 
+def parse_rule(line: str) -> Tuple[str, Dict[str, int]]:
+	full_line_match = FULL_BAG_RULE_RE.fullmatch(line.strip())
+	if full_line_match is None:
+		raise ValueError(f"not a bag rule: {line.strip()}")
+	this_color = full_line_match.group(1)
+	other_colors_str = full_line_match.group(2)
+	inner_dict = dict()
+	if other_colors_str != "no other bags":
+		for color_block in other_colors_str.split(","):
+			one_color_match = ONE_COLOR_RE.fullmatch(color_block.strip())
+			if one_color_match is None:
+				raise ValueError(f"not a bag count: {color_block.strip()}")
+			count = int(one_color_match.group(1))
+			other_color = one_color_match.group(2)
+			inner_dict[other_color] = count
+	return this_color, inner_dict
+
+
 def read_input_file() -> Tuple[Dict[str, Dict[str, int]], Set[str]]:
 	rules = dict()
 	colors = set()
 	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
 		for line in in_file:
-			full_line_match = FULL_BAG_RULE_RE.fullmatch(line.strip())
-			this_color = full_line_match.group(1)
+			this_color, inner_dict = parse_rule(line)
 			colors.add(this_color)
-			other_colors_str = full_line_match.group(2)
-			inner_dict = dict()
-			if other_colors_str != "no other bags":
-				for color_block in other_colors_str.split(","):
-					one_color_match = ONE_COLOR_RE.fullmatch(color_block.strip())
-					count = int(one_color_match.group(1))
-					other_color = one_color_match.group(2)
-					colors.add(other_color)
-					inner_dict[other_color] = count
+			colors.update(inner_dict)
 			rules[this_color] = inner_dict
 	return rules, colors
 
@@ -62,9 +72,162 @@ def count_inner_bags(source_color: str, rules: Dict[str, Dict[str, int]]) -> int
 	return inner_count
 
 
+def edges_to_csr(n: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	# the edges out of vertex v are indices[indptr[v]:indptr[v + 1]], with matching weights
+	order = np.argsort(sources, kind="stable")
+	indptr = np.zeros(n + 1, dtype=np.int64)
+	np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+	return indptr, targets[order], weights[order]
+
+
+class BagGraph:
+	# colors are interned to ints; forward edges go from a bag to the bags it holds directly,
+	# reverse edges from a bag to the bags that hold it directly
+	def __init__(self, colors: List[str], sources: List[int], targets: List[int], counts: List[int]):
+		self.colors = colors
+		self.color_ids = {color: i for i, color in enumerate(colors)}
+		sources = np.array(sources, dtype=np.int64)
+		targets = np.array(targets, dtype=np.int64)
+		counts = np.array(counts, dtype=np.int64)
+		self.indptr, self.indices, self.weights = edges_to_csr(len(colors), sources, targets, counts)
+		self.reverse_indptr, self.reverse_indices, self.reverse_weights = edges_to_csr(len(colors), targets, sources, counts)
+
+	def __len__(self) -> int:
+		return len(self.colors)
+
+	def inner(self, color_id: int) -> Tuple[np.ndarray, np.ndarray]:
+		start, end = self.indptr[color_id], self.indptr[color_id + 1]
+		return self.indices[start:end], self.weights[start:end]
+
+	def outer(self, color_id: int) -> np.ndarray:
+		return self.reverse_indices[self.reverse_indptr[color_id]:self.reverse_indptr[color_id + 1]]
+
+
+def intern_color(color: str, color_ids: Dict[str, int], colors: List[str]) -> int:
+	if color not in color_ids:
+		color_ids[color] = len(colors)
+		colors.append(color)
+	return color_ids[color]
+
+
+def compile_bag_graph(rules: Dict[str, Dict[str, int]], colors: Set[str]) -> BagGraph:
+	color_list = sorted(colors)
+	color_ids = {color: i for i, color in enumerate(color_list)}
+	sources = list()
+	targets = list()
+	counts = list()
+	for this_color, inner_colors in rules.items():
+		for inner_color, count in inner_colors.items():
+			sources.append(color_ids[this_color])
+			targets.append(color_ids[inner_color])
+			counts.append(count)
+	return BagGraph(color_list, sources, targets, counts)
+
+
+def read_bag_graph() -> BagGraph:
+	# parse straight into interned edge lists, without building the whole string-keyed rule dict
+	color_ids = dict()
+	colors = list()
+	sources = list()
+	targets = list()
+	counts = list()
+	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
+		for line in in_file:
+			this_color, inner_dict = parse_rule(line)
+			this_id = intern_color(this_color, color_ids, colors)
+			for inner_color, count in inner_dict.items():
+				sources.append(this_id)
+				targets.append(intern_color(inner_color, color_ids, colors))
+				counts.append(count)
+	return BagGraph(colors, sources, targets, counts)
+
+
+def count_containing_colors_csr(source_color: str, graph: BagGraph) -> int:
+	# breadth-first over the reverse edges, one whole frontier at a time
+	visited = np.zeros(len(graph), dtype=bool)
+	frontier = np.array([graph.color_ids[source_color]], dtype=np.int64)
+	visited[frontier] = True
+	while len(frontier) > 0:
+		starts = graph.reverse_indptr[frontier]
+		ends = graph.reverse_indptr[frontier + 1]
+		lengths = ends - starts
+		edge_positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(np.sum(lengths))
+		neighbors = np.unique(graph.reverse_indices[edge_positions])
+		frontier = neighbors[~visited[neighbors]]
+		visited[frontier] = True
+	return int(np.count_nonzero(visited)) - 1
+
+
+def count_inner_bags_csr(source_color: str, graph: BagGraph) -> int:
+	# count level by level, merging every path that reaches the same color at the same depth
+	inner_count = 0
+	frontier = {graph.color_ids[source_color]: 1}
+	while len(frontier) > 0:
+		next_frontier = dict()
+		for color_id, multiplier in frontier.items():
+			inner_ids, inner_counts = graph.inner(color_id)
+			for inner_id, count in zip(inner_ids.tolist(), inner_counts.tolist()):
+				next_frontier[inner_id] = next_frontier.get(inner_id, 0) + multiplier * count
+		inner_count += sum(next_frontier.values())
+		frontier = next_frontier
+	return inner_count
+
+
+def innermost_first_order(graph: BagGraph) -> List[int]:
+	# Kahn's algorithm on the forward edges: a color comes after every color it holds
+	remaining_inner = np.diff(graph.indptr).tolist()
+	reverse_indptr = graph.reverse_indptr.tolist()
+	reverse_indices = graph.reverse_indices.tolist()
+	order = [color_id for color_id in range(len(graph)) if remaining_inner[color_id] == 0]
+	i = 0
+	while i < len(order):
+		color_id = order[i]
+		i += 1
+		for outer_id in reverse_indices[reverse_indptr[color_id]:reverse_indptr[color_id + 1]]:
+			remaining_inner[outer_id] -= 1
+			if remaining_inner[outer_id] == 0:
+				order.append(outer_id)
+	if len(order) < len(graph):
+		in_cycle = [graph.colors[color_id] for color_id in range(len(graph)) if remaining_inner[color_id] > 0]
+		raise ValueError(f"bag rules contain a cycle through some of: {in_cycle[:10]}")
+	return order
+
+
+class BagAggregates:
+	# inner bag totals and containing color counts for every color, computed once up front
+	def __init__(self, graph: BagGraph):
+		self.graph = graph
+		order = innermost_first_order(graph)
+		indptr = graph.indptr.tolist()
+		indices = graph.indices.tolist()
+		weights = graph.weights.tolist()
+		reverse_indptr = graph.reverse_indptr.tolist()
+		reverse_indices = graph.reverse_indices.tolist()
+		# innermost first, so every inner color's total is ready before it's needed
+		self.inner_totals = [0] * len(graph)
+		for color_id in order:
+			total = 0
+			for edge in range(indptr[color_id], indptr[color_id + 1]):
+				total += weights[edge] * (1 + self.inner_totals[indices[edge]])
+			self.inner_totals[color_id] = total
+		# outermost first; each color's ancestors are a bitset with one bit per color
+		ancestors = [0] * len(graph)
+		for color_id in reversed(order):
+			bits = 0
+			for outer_id in reverse_indices[reverse_indptr[color_id]:reverse_indptr[color_id + 1]]:
+				bits |= ancestors[outer_id] | (1 << outer_id)
+			ancestors[color_id] = bits
+		self.containing_counts = [bits.bit_count() for bits in ancestors]
+
+	def inner_count(self, color: str) -> int:
+		return self.inner_totals[self.graph.color_ids[color]]
+
+	def containing_count(self, color: str) -> int:
+		return self.containing_counts[self.graph.color_ids[color]]
+
+
 if __name__ == "__main__":
-	rules_dict, colors_set = read_input_file()
-	containing_graph = build_containing_graph(rules_dict, colors_set)
-	print(f"number of colors that can contain {TARGET_COLOR}:", count_containing_colors(TARGET_COLOR, containing_graph))
-	print(f"number of bags inside the {TARGET_COLOR} bag:", count_inner_bags(TARGET_COLOR, rules_dict))
+	bag_aggregates = BagAggregates(read_bag_graph())
+	print(f"number of colors that can contain {TARGET_COLOR}:", bag_aggregates.containing_count(TARGET_COLOR))
+	print(f"number of bags inside the {TARGET_COLOR} bag:", bag_aggregates.inner_count(TARGET_COLOR))
 
@@ -1,4 +1,8 @@
-from typing import List, Tuple, Union
+import csv
+import json
+import time
+from array import array
+from typing import Dict, List, Tuple, Union
 from constants import UTF_8
 
 
@@ -6,6 +10,11 @@ INPUT_FILE_NAME = "game_code.txt"
 ACCUMULATE = "acc"
 JUMP = "jmp"
 NO_OPERATION = "nop"
+ACCUMULATE_CODE = 0
+JUMP_CODE = 1
+NO_OPERATION_CODE = 2
+OPCODES = {ACCUMULATE: ACCUMULATE_CODE, JUMP: JUMP_CODE, NO_OPERATION: NO_OPERATION_CODE}
+OPCODE_NAMES = {code: command for command, code in OPCODES.items()}
 
 
 def read_input_file() -> List[Tuple[str, int]]:
@@ -20,45 +29,226 @@ def read_input_file() -> List[Tuple[str, int]]:
 	return to_return
 
 
+class ExecutionProfile:
+	# what profiled runs of one program did; counts and timings add up over every profiled run
+	def __init__(self, n_lines: int):
+		self.execution_counts = array("q", bytes(8 * n_lines))
+		self.opcode_counts = {command: 0 for command in OPCODES}
+		self.opcode_seconds = {command: 0.0 for command in OPCODES}
+		self.trace_length = 0
+		self.loop_entry = None  # the line that would have run a second time, if the last run looped
+		self.accumulator = None
+		self.terminated = None
+
+	def hot_lines(self, top: int = 10) -> List[Tuple[int, int]]:
+		# (line, execution count) for the most executed lines
+		ranked = sorted(range(len(self.execution_counts)), key=lambda line: self.execution_counts[line], reverse=True)
+		return [(line, self.execution_counts[line]) for line in ranked[:top] if self.execution_counts[line] > 0]
+
+	def summary(self) -> Dict:
+		return {
+			"trace_length": self.trace_length,
+			"loop_entry": self.loop_entry,
+			"terminated": self.terminated,
+			"accumulator": self.accumulator,
+			"opcode_counts": self.opcode_counts,
+			"opcode_seconds": self.opcode_seconds,
+			"hot_lines": self.hot_lines(),
+		}
+
+	def to_json(self) -> str:
+		return json.dumps(self.summary(), indent=2)
+
+	def write_csv(self, file_name: str, vm: "HandheldVM"):
+		# one row per line of the program
+		with open(file_name, "w", encoding=UTF_8, newline="") as out_file:
+			writer = csv.writer(out_file)
+			writer.writerow(["line", "command", "argument", "execution_count"])
+			for line in range(len(vm)):
+				writer.writerow([line, OPCODE_NAMES[vm.opcodes[line]], vm.arguments[line], self.execution_counts[line]])
+
+
+class HandheldVM:
+	# the program compiled to an opcode per instruction and a matching argument
+	def __init__(self, commands: List[Tuple[str, int]]):
+		for i, (command, num) in enumerate(commands):
+			if command not in OPCODES:
+				raise ValueError(f"UNKNOWN COMMAND - line {i}: {command} {num}")
+		self.opcodes = array("b", [OPCODES[command] for command, _ in commands])
+		self.arguments = array("i", [num for _, num in commands])
+		# the dispatch table: what each line adds to the accumulator, and which line runs after it
+		self.accumulator_deltas = array("q", [num if command == ACCUMULATE else 0 for command, num in commands])
+		self.next_lines = array("q", [i + num if command == JUMP else i + 1 for i, (command, num) in enumerate(commands)])
+		self.reset()
+
+	def __len__(self) -> int:
+		return len(self.opcodes)
+
+	def reset(self):
+		self.accumulator = 0
+		self.pointer = 0
+		self.visited = bytearray(len(self.opcodes))
+		self.terminated = False  # ran off the end of the program
+		self.looped = False  # about to run an instruction a second time
+
+	def check_state(self) -> bool:
+		# whether the program can keep going
+		if self.pointer == len(self.opcodes):
+			self.terminated = True
+			return False
+		if not (0 <= self.pointer < len(self.opcodes)):
+			raise IndexError(f"jumped outside the program to line {self.pointer}")
+		if self.visited[self.pointer]:
+			self.looped = True
+			return False
+		return True
+
+	def step(self) -> bool:
+		if self.terminated or self.looped or not self.check_state():
+			return False
+		self.visited[self.pointer] = 1
+		self.accumulator += self.accumulator_deltas[self.pointer]
+		self.pointer = self.next_lines[self.pointer]
+		return True
+
+	def run(self, profile: ExecutionProfile = None) -> Union[None, int]:
+		# the accumulator if the program finishes, or None if it would repeat an instruction
+		if profile is not None:
+			return self.run_profiled(profile)
+		accumulator_deltas = self.accumulator_deltas
+		next_lines = self.next_lines
+		visited = self.visited
+		n = len(next_lines)
+		accumulator = self.accumulator
+		pointer = self.pointer
+		while 0 <= pointer < n and not visited[pointer]:
+			visited[pointer] = 1
+			accumulator += accumulator_deltas[pointer]
+			pointer = next_lines[pointer]
+		self.accumulator = accumulator
+		self.pointer = pointer
+		self.check_state()
+		return self.accumulator if self.terminated else None
+
+	def run_profiled(self, profile: ExecutionProfile) -> Union[None, int]:
+		# the same as run(), but timing every instruction; slower, so it's only used when asked for
+		opcode_names = [OPCODE_NAMES[code] for code in range(len(OPCODE_NAMES))]
+		opcode_counts = [0] * len(opcode_names)
+		opcode_seconds = [0.0] * len(opcode_names)
+		execution_counts = profile.execution_counts
+		n = len(self)
+		steps = 0
+		while 0 <= self.pointer < n and not self.visited[self.pointer]:
+			line = self.pointer
+			opcode = self.opcodes[line]
+			time_start = time.perf_counter()
+			self.visited[line] = 1
+			self.accumulator += self.accumulator_deltas[line]
+			self.pointer = self.next_lines[line]
+			time_end = time.perf_counter()
+			execution_counts[line] += 1
+			opcode_counts[opcode] += 1
+			opcode_seconds[opcode] += time_end - time_start
+			steps += 1
+		self.check_state()
+		for code, command in enumerate(opcode_names):
+			profile.opcode_counts[command] += opcode_counts[code]
+			profile.opcode_seconds[command] += opcode_seconds[code]
+		profile.trace_length += steps
+		profile.loop_entry = self.pointer if self.looped else None
+		profile.terminated = self.terminated
+		profile.accumulator = self.accumulator
+		return self.accumulator if self.terminated else None
+
+	def trace(self) -> List[int]:
+		# the line numbers run from here on, in order
+		lines = list()
+		while not (self.terminated or self.looped):
+			line = self.pointer
+			if self.step():
+				lines.append(line)
+		return lines
+
+
 def execute_commands_no_loop(commands: List[Tuple[str, int]]) -> Union[None, int]:
+	return HandheldVM(commands).run()
+
+
+def find_terminating_lines(vm: HandheldVM) -> bytearray:
+	# walk the control flow graph backwards from the end of the program
+	n = len(vm)
+	coming_from = [list() for _ in range(n + 1)]
+	for line, next_line in enumerate(vm.next_lines):
+		if 0 <= next_line <= n:
+			coming_from[next_line].append(line)
+	terminates = bytearray(n + 1)
+	terminates[n] = 1
+	to_visit = [n]
+	while len(to_visit) > 0:
+		for line in coming_from[to_visit.pop()]:
+			if not terminates[line]:
+				terminates[line] = 1
+				to_visit.append(line)
+	return terminates
+
+
+def flipped_next_line(vm: HandheldVM, line: int) -> int:
+	if vm.opcodes[line] == JUMP_CODE:
+		return line + 1
+	return line + vm.arguments[line]  # a nop that becomes a jmp
+
+
+def run_with_flip(vm: HandheldVM, line: int) -> Union[None, int]:
+	# the accumulator at the end with line's nop/jmp flipped, or None if that loops or jumps out of the program
+	n = len(vm)
+	target = flipped_next_line(vm, line)
+	visited = bytearray(n)
 	accumulator = 0
-	next_command_index = 0
-	used_commands = set()
-	while next_command_index not in used_commands:
-		if next_command_index == len(commands):
-			# we successfully finished the program
-			return accumulator
-		used_commands.add(next_command_index)
-		command, num = commands[next_command_index]
-		if command == ACCUMULATE:
-			accumulator += num
-			next_command_index += 1
-		elif command == JUMP:
-			next_command_index += num
-		elif command == NO_OPERATION:
-			next_command_index += 1
-		else:
-			raise ValueError(f"UNKNOWN COMMAND - line {next_command_index}: {command} {num}")
-	return None  # the while loop closed, meaning we tried to repeat a command
+	pointer = 0
+	while pointer != n:
+		if not (0 <= pointer < n) or visited[pointer]:
+			return None
+		visited[pointer] = 1
+		accumulator += vm.accumulator_deltas[pointer]
+		pointer = target if pointer == line else vm.next_lines[pointer]
+	return accumulator
 
 
-def find_problem(commands: List[Tuple[str, int]]) -> int:
-	for i in range(len(commands)):
-		original = commands[i][0]
-		if original == ACCUMULATE:
+def find_repair(vm: HandheldVM) -> Tuple[int, int]:
+	# the line whose nop/jmp flip lets the program finish, and the accumulator it finishes with
+	n = len(vm)
+	vm.reset()
+	try:
+		loops = (vm.run() is None)
+	except IndexError:
+		loops = False  # jumps out of the program instead
+	if loops:
+		# the flip has to be on the original path, and has to lead somewhere that already terminates
+		terminates = find_terminating_lines(vm)
+		vm.reset()
+		candidates = list()
+		for line in vm.trace():
+			target = flipped_next_line(vm, line)
+			if 0 <= target <= n and terminates[target]:
+				candidates.append(line)
+		candidates.sort()  # the first line that works, like flipping one line at a time in order
+	else:
+		# no loop to narrow things down, so try every flip in order
+		candidates = range(n)
+	for line in candidates:
+		if vm.opcodes[line] == ACCUMULATE_CODE:
 			continue
-		if original == NO_OPERATION:
-			new_commands = commands[:i] + [(JUMP, commands[i][1])] + commands[(i + 1):]
-		elif original == JUMP:
-			new_commands = commands[:i] + [(NO_OPERATION, commands[i][1])] + commands[(i + 1):]
-		else:
-			raise ValueError(f"UNKNOWN COMMAND - line {i}: {commands[i][0]} {commands[i][1]}")
-		val = execute_commands_no_loop(new_commands)
-		if val is not None:
-			return val
+		accumulator = run_with_flip(vm, line)
+		if accumulator is not None:
+			return line, accumulator
 	raise ValueError("NO ANSWER")
 
 
+def find_problem(commands: List[Tuple[str, int]]) -> int:
+	_, accumulator = find_repair(HandheldVM(commands))
+	return accumulator
+
+
 if __name__ == "__main__":
 	command_list = read_input_file()
 	print(find_problem(command_list))
@@ -1,23 +1,20 @@
-from typing import List
-from constants import UTF_8
+from collections import Counter, deque
+from typing import List, Sequence, Tuple, Union
+import numpy as np
+from int_loading import read_int_array
 
 
 INPUT_FILE_NAME = "masking.txt"
 WINDOW_LENGTH = 25
 
 
-def read_input_file() -> List[int]:
-	to_return = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line_ in in_file:
-			line = line_.strip()
-			to_return.append(int(line))
-	return to_return
+def read_input_file() -> np.ndarray:
+	return read_int_array(INPUT_FILE_NAME)
 
 
-def is_paired_sum(target_sum: int, preceding_numbers: List[int]) -> bool:
+def is_paired_sum(target_sum: int, preceding_numbers: List[int], window_length: int = WINDOW_LENGTH) -> bool:
 	n = len(preceding_numbers)
-	if n != WINDOW_LENGTH:
+	if n != window_length:
 		raise ValueError("window not the right size! actual size:", n)
 	for i in range(n - 1):
 		for j in range(i + 1, n):
@@ -26,35 +23,140 @@ def is_paired_sum(target_sum: int, preceding_numbers: List[int]) -> bool:
 	return False
 
 
-def find_contiguous_sum(target_sum: int, numbers: List[int]) -> List[int]:
+def find_contiguous_range(target_sum: int, numbers: Sequence[int]) -> Union[None, Tuple[int, int]]:
+	# two pointers over non-negative numbers, keeping a running sum of numbers[i:j]
 	n = len(numbers)
 	i = 0
-	j = 1
+	j = min(1, n)
+	s = sum(numbers[i:j])
 	while True:
-		chunk = numbers[i:j]
-		s = sum(chunk)
 		if s == target_sum:
-			return chunk
+			return i, j
 		elif s < target_sum:
+			if j == n:  # need more numbers, but there are none
+				return None
+			s += numbers[j]
 			j += 1
-			if j > n:  # need more numbers, but there are none
-				return list()
 		else:  # s > target_sum
+			if i == j:  # nothing left to drop
+				return None
+			s -= numbers[i]
 			i += 1
-			if i > n:  # at the end of the list
-				return list()
+
+
+def find_contiguous_sum(target_sum: int, numbers: Sequence[int]) -> List[int]:
+	found = find_contiguous_range(target_sum, numbers)
+	if found is None:
+		return list()
+	i, j = found
+	return list(numbers[i:j])
+
+
+def find_all_contiguous_ranges(target_sum: int, numbers: np.ndarray, min_length: int = 1) -> List[Tuple[int, int]]:
+	# every (i, j) with sum(numbers[i:j]) == target_sum, as prefix[j] - prefix[i] == target_sum
+	prefix = np.concatenate(([0], np.cumsum(numbers, dtype=np.int64)))
+	ranges = list()
+	if np.all(numbers >= 0):
+		# the prefix sums never go down, so every matching j for an i is one run found by searchsorted
+		firsts = np.searchsorted(prefix, prefix + target_sum, side="left")
+		lasts = np.searchsorted(prefix, prefix + target_sum, side="right")
+		for i in np.flatnonzero(lasts > firsts).tolist():
+			for j in range(max(int(firsts[i]), i + min_length), int(lasts[i])):
+				ranges.append((i, j))
+		return ranges
+	# with negative numbers, look each prefix sum up among the earlier ones instead
+	earlier_prefixes = dict()
+	for j, prefix_sum in enumerate(prefix.tolist()):
+		for i in earlier_prefixes.get(prefix_sum - target_sum, []):
+			if j - i >= min_length:
+				ranges.append((i, j))
+		earlier_prefixes.setdefault(prefix_sum, list()).append(j)
+	ranges.sort()
+	return ranges
+
+
+class SparseTable:
+	# O(1) queries of an idempotent reduction (like min or max) over any numbers[i:j]
+	def __init__(self, numbers: np.ndarray, reduce: np.ufunc):
+		self.reduce = reduce
+		self.levels = [np.asarray(numbers)]
+		width = 1
+		while 2 * width <= len(numbers):
+			previous = self.levels[-1]
+			self.levels.append(reduce(previous[:-width], previous[width:]))
+			width *= 2
+
+	def query(self, i: int, j: int):
+		if j <= i:
+			raise ValueError(f"empty range: [{i}, {j})")
+		level = (j - i).bit_length() - 1
+		level_values = self.levels[level]
+		return self.reduce(level_values[i], level_values[j - (1 << level)])
+
+
+class SlidingPairWindow:
+	# the last window_length numbers, kept as a multiset so sliding the window costs O(1);
+	# with track_pair_sums, also the count of every pair sum, so each check costs O(1)
+	def __init__(self, window_length: int = WINDOW_LENGTH, track_pair_sums: bool = False):
+		self.window_length = window_length
+		self.numbers = deque()
+		self.counts = Counter()
+		self.pair_sums = Counter() if track_pair_sums else None
+
+	def is_full(self) -> bool:
+		return len(self.numbers) == self.window_length
+
+	def push(self, number: int):
+		if self.is_full():
+			oldest = self.numbers.popleft()
+			self.counts[oldest] -= 1
+			if self.counts[oldest] == 0:
+				del self.counts[oldest]
+			if self.pair_sums is not None:
+				for other in self.numbers:
+					pair_sum = oldest + other
+					self.pair_sums[pair_sum] -= 1
+					if self.pair_sums[pair_sum] == 0:
+						del self.pair_sums[pair_sum]
+		if self.pair_sums is not None:
+			for other in self.numbers:
+				self.pair_sums[number + other] += 1
+		self.numbers.append(number)
+		self.counts[number] += 1
+
+	def is_paired_sum(self, target_sum: int) -> bool:
+		if self.pair_sums is not None:
+			return self.pair_sums[target_sum] > 0
+		for number, count in self.counts.items():
+			other = target_sum - number
+			if other == number:
+				if count > 1:
+					return True
+			elif other in self.counts:
+				return True
+		return False
+
+
+def find_first_unpaired(numbers: Sequence[int], window_length: int = WINDOW_LENGTH, track_pair_sums: bool = False) -> Union[None, int]:
+	# the first number that isn't the sum of two of the window_length numbers before it
+	window = SlidingPairWindow(window_length, track_pair_sums)
+	for number in numbers:
+		if window.is_full() and not window.is_paired_sum(number):
+			return number
+		window.push(number)
+	return None
 
 
 if __name__ == "__main__":
-	number_list = read_input_file()
-	for window_start in range(len(number_list) - (WINDOW_LENGTH + 1)):
-		window_end = window_start + WINDOW_LENGTH
-		target = number_list[window_end]
-		if not is_paired_sum(target, number_list[window_start:window_end]):
-			print("failed target:", target)
-			contiguous_chunk = find_contiguous_sum(target, number_list)
-			if len(contiguous_chunk) == 0:
-				print("NO ANSWER")
-			else:
-				print("min + max:", min(contiguous_chunk) + max(contiguous_chunk))
-			break
+	number_list = read_input_file().tolist()
+	target = find_first_unpaired(number_list)
+	if target is not None:
+		print("failed target:", target)
+		contiguous_range = find_contiguous_range(target, number_list)
+		if contiguous_range is None or contiguous_range[0] == contiguous_range[1]:
+			print("NO ANSWER")
+		else:
+			number_array = np.array(number_list, dtype=np.int64)
+			range_min = SparseTable(number_array, np.minimum).query(*contiguous_range)
+			range_max = SparseTable(number_array, np.maximum).query(*contiguous_range)
+			print("min + max:", range_min + range_max)
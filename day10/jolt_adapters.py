@@ -1,133 +1,70 @@
-from typing import Dict, List, Set, Tuple
-from constants import UTF_8
+from collections import deque
+from typing import Sequence
+import numpy as np
+from int_loading import read_int_array
 
 
 INPUT_FILE_NAME = "adapters.txt"
-
-
-def read_input_file() -> List[int]:
-	to_return = list()
-	with open(INPUT_FILE_NAME, "r", encoding=UTF_8) as in_file:
-		for line_ in in_file:
-			line = line_.strip()
-			to_return.append(int(line))
-	return to_return
-
-
-def make_graph(joltages: List[int]) -> Dict[int, Dict[int, int]]:
-	n = len(joltages)
-	graph = dict()
-	for i in range(n):
-		graph[i] = dict()
-		in_joltage = joltages[i]
-		for j in range(i + 1, n):
-			out_joltage = joltages[j]
-			diff = out_joltage - in_joltage
-			if diff > 3:
-				break
-			graph[i][j] = diff
-	return graph
-
-
-def dfs_spanning_path(graph: Dict[int, Dict[int, int]], to_visit: int, target: int, path: List[int]) -> bool:
-	if to_visit in path:
-		return False
-	path.append(to_visit)
-	if to_visit == target:
-		all_in = True
-		for vertex in graph:
-			if vertex not in path:
-				all_in = False
-				break
-		if all_in:
-			return True
-	for neighbor in graph[path[-1]]:
-		result = dfs_spanning_path(graph, neighbor, target, path)
-		if result:
-			return result
-	path.pop(-1)
-	return False
-
-
-def path_to_costs(graph: Dict[int, Dict[int, int]], path: List[int]) -> List[int]:
-	to_return = list()
-	for i in range(len(path) - 1):
-		to_return.append(graph[path[i]][path[i + 1]])
-	return to_return
-
-
-def count_1_and_3(costs: List[int]) -> Tuple[int, int]:
-	ones = 0
-	threes = 0
-	for c in costs:
-		if c == 1:
-			ones += 1
-		elif c == 3:
-			threes += 1
-	return ones, threes
-
-
-def find_chunks(graph: Dict[int, Dict[int, int]], start_index: int, end_index: int) -> List[List[int]]:
-	chunks = list()
-	i = start_index
-	while i < end_index:  # if i is at the last valid index then we need to stop
-		furthest_neighbor = -1
-		for neighbor in graph[i]:
-			furthest_neighbor = max(neighbor, furthest_neighbor)
-		if furthest_neighbor == -1:
-			raise ValueError("NO NEIGHBORS FOUND!")
-		new_furthest_neighbor = furthest_neighbor
-		for j in range(i + 1, furthest_neighbor - 1):
-			for neighbor in graph[j]:
-				new_furthest_neighbor = max(neighbor, new_furthest_neighbor)
-		chunks.append(list(range(i, new_furthest_neighbor + 1)))
-		i = new_furthest_neighbor
-	return chunks
-
-
-def dfs_all_paths(graph: Dict[int, Dict[int, int]], to_visit: int, target: int, path: List[int], all_paths: Set[str]):
-	if to_visit in path:
-		return
-	path.append(to_visit)
-	if to_visit == target:
-		all_paths.add(str(path))
-		path.pop(-1)
-		return
-	for neighbor in graph[path[-1]]:
-		dfs_all_paths(graph, neighbor, target, path, all_paths)
-	path.pop(-1)
-
-
-def count_paths_chunk(graph: Dict[int, Dict[int, int]], chunk: List[int]) -> int:
-	all_paths = set()
-	dfs_all_paths(graph, chunk[0], chunk[-1], [], all_paths)
-	return len(all_paths)
-
-
-def count_possible_paths(graph: Dict[int, Dict[int, int]], start_index: int, end_index: int) -> int:
-	chunks = find_chunks(graph, start_index, end_index)
-	product = 1
-	for chunk in chunks:
-		path_count = count_paths_chunk(graph, chunk)
-		product *= path_count
-	return product
+MAX_JOLTAGE_GAP = 3
+DEVICE_JOLTAGE_OFFSET = 3  # the device is always this many jolts above the biggest adapter
+COUNTING_SORT_SPAN_FACTOR = 4  # counting sort when the joltages span at most this many values per adapter
+
+
+def read_input_file() -> np.ndarray:
+	return read_int_array(INPUT_FILE_NAME)
+
+
+def count_arrangements(joltages: Sequence[int], max_gap: int = MAX_JOLTAGE_GAP) -> int:
+	# joltages sorted, from the outlet to the device; the ways to reach each joltage are the sum of
+	# the ways to reach every earlier joltage within max_gap, so only that window is kept
+	if len(joltages) == 0:
+		return 0
+	window = deque([(joltages[0], 1)])
+	window_sum = 1
+	for joltage in joltages[1:]:
+		while len(window) > 0 and joltage - window[0][0] > max_gap:
+			window_sum -= window.popleft()[1]
+		if len(window) == 0:
+			return 0  # this gap can't be crossed at all
+		ways = window_sum
+		window.append((joltage, ways))
+		window_sum += ways
+	return window[-1][1]
+
+
+def sort_joltages(adapters: np.ndarray) -> np.ndarray:
+	# a counting sort when the joltages fall in a small range, otherwise a regular sort
+	if len(adapters) == 0:
+		return np.asarray(adapters, dtype=np.int64)
+	low = int(np.min(adapters))
+	span = int(np.max(adapters)) - low + 1
+	if span > COUNTING_SORT_SPAN_FACTOR * len(adapters):
+		return np.sort(adapters)
+	counts = np.bincount(np.asarray(adapters, dtype=np.int64) - low, minlength=span)
+	return np.repeat(np.arange(low, low + span, dtype=np.int64), counts)
+
+
+def joltage_chain(adapters: np.ndarray) -> np.ndarray:
+	# every adapter in order, from the outlet at 0 to the device just above the biggest adapter
+	sorted_adapters = sort_joltages(adapters)
+	device_joltage = DEVICE_JOLTAGE_OFFSET + (int(sorted_adapters[-1]) if len(sorted_adapters) > 0 else 0)
+	return np.concatenate(([0], sorted_adapters, [device_joltage])).astype(np.int64)
+
+
+def joltage_histogram(adapters: np.ndarray, max_gap: int = MAX_JOLTAGE_GAP) -> np.ndarray:
+	# histogram[d] is how many steps in the full chain go up by d jolts
+	differences = np.diff(joltage_chain(adapters))
+	if np.any(differences < 0) or np.any(differences > max_gap):
+		bad_step = int(np.flatnonzero((differences < 0) | (differences > max_gap))[0])
+		raise ValueError(f"adapter chain is broken after step {bad_step}: a gap of {differences[bad_step]} jolts")
+	return np.bincount(differences, minlength=max_gap + 1)
 
 
 if __name__ == "__main__":
-	adapter_list = read_input_file()
-	adapter_list.sort()
-	num_adapters = len(adapter_list)
-	device_joltage = 3 + adapter_list[-1]
-	joltage_list = [0] + adapter_list + [device_joltage]
-	source_index = 0
-	device_index = num_adapters + 1
-	g = make_graph(joltage_list)
-	spanning_path = list()
-	success = dfs_spanning_path(g, source_index, device_index, spanning_path)
-	if not success:
-		raise ValueError("NO ANSWER")
-	spanning_path_costs = path_to_costs(g, spanning_path)
-	count_1, count_3 = count_1_and_3(spanning_path_costs)
+	adapter_array = read_input_file()
+	histogram = joltage_histogram(adapter_array)
+	count_1 = int(histogram[1])
+	count_3 = int(histogram[3])
 	print(f"product of {count_1} and {count_3}:", count_1 * count_3)
-	arrangement_count = count_possible_paths(g, source_index, device_index)
+	arrangement_count = count_arrangements(joltage_chain(adapter_array).tolist())
 	print("count of all possible arrangements:", arrangement_count)
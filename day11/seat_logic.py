@@ -7,6 +7,11 @@ INPUT_FILE_NAME = "seats.txt"
 FLOOR = -1
 SEAT_EMPTY = 0
 SEAT_OCCUPIED = 1
+NO_SEAT = -1
+ALL_DIRECTIONS = [(row_shift, col_shift) for row_shift in [-1, 0, 1] for col_shift in [-1, 0, 1] if (row_shift, col_shift) != (0, 0)]
+CROWDED_ADJACENT = 4
+CROWDED_VISIBLE = 5
+FULL_STEP_SHARE = 0.3  # step every seat at once when more than this share of them might change
 
 
 def read_input_file() -> np.ndarray:
@@ -66,15 +71,150 @@ def advance_time(seats: np.ndarray) -> np.ndarray:
 	return new_seats
 
 
+def number_seats(seats: np.ndarray) -> np.ndarray:
+	# each seat's index among all the seats in row-major order, or NO_SEAT for floor
+	seat_ids = np.full(seats.shape, NO_SEAT, dtype=np.int64)
+	is_seat = (seats != FLOOR)
+	seat_ids[is_seat] = np.arange(np.count_nonzero(is_seat))
+	return seat_ids
+
+
+def first_visible_seat(seat_ids: np.ndarray, row_shift: int, col_shift: int) -> np.ndarray:
+	# for every cell, the id of the first seat seen looking in one direction, or NO_SEAT
+	if row_shift == 0:
+		# look along the columns of the transposed grid instead
+		return first_visible_seat(seat_ids.T, col_shift, row_shift).T
+	if row_shift < 0:
+		# look down the upside-down grid instead
+		return first_visible_seat(seat_ids[::-1], -row_shift, col_shift)[::-1]
+	n_rows, n_cols = seat_ids.shape
+	# nearest[r, c] is the first seat at or past (r, c) in this direction; fill it in from the far end
+	nearest = np.full(seat_ids.shape, NO_SEAT, dtype=np.int64)
+	visible = np.full(seat_ids.shape, NO_SEAT, dtype=np.int64)
+	nearest[-1] = seat_ids[-1]
+	for row in range(n_rows - 2, -1, -1):
+		# the next cell along the line of sight is (row + 1, col + col_shift)
+		ahead = np.full(n_cols, NO_SEAT, dtype=np.int64)
+		if col_shift == 0:
+			ahead[:] = nearest[row + 1]
+		elif col_shift > 0:
+			ahead[:-1] = nearest[row + 1, 1:]
+		else:
+			ahead[1:] = nearest[row + 1, :-1]
+		visible[row] = ahead
+		nearest[row] = np.where(seat_ids[row] != NO_SEAT, seat_ids[row], ahead)
+	return visible
+
+
+def build_visible_neighbors(seats: np.ndarray) -> np.ndarray:
+	# (seats, 8): the first seat visible from each seat in every direction, NO_SEAT where there is none
+	seat_ids = number_seats(seats)
+	is_seat = (seat_ids != NO_SEAT)
+	neighbors = np.empty((np.count_nonzero(is_seat), len(ALL_DIRECTIONS)), dtype=np.int64)
+	for d, (row_shift, col_shift) in enumerate(ALL_DIRECTIONS):
+		neighbors[:, d] = first_visible_seat(seat_ids, row_shift, col_shift)[is_seat]
+	return neighbors
+
+
+def advance_time_visible(occupied: np.ndarray, neighbors: np.ndarray, crowded: int = CROWDED_VISIBLE) -> np.ndarray:
+	# occupied has one entry per seat; an extra empty seat at the end stands in for NO_SEAT
+	padded = np.append(occupied, False)
+	visible_count = np.count_nonzero(padded[neighbors], axis=1)
+	return np.where(occupied, visible_count < crowded, visible_count == 0)
+
+
+def build_adjacent_neighbors(seats: np.ndarray) -> np.ndarray:
+	# (seats, 8): the seat right next to each seat in every direction, NO_SEAT where there is none
+	seat_ids = number_seats(seats)
+	is_seat = (seat_ids != NO_SEAT)
+	padded_ids = np.pad(seat_ids, 1, constant_values=NO_SEAT)
+	n_rows, n_cols = seat_ids.shape
+	neighbors = np.empty((np.count_nonzero(is_seat), len(ALL_DIRECTIONS)), dtype=np.int64)
+	for d, (row_shift, col_shift) in enumerate(ALL_DIRECTIONS):
+		shifted = padded_ids[(1 + row_shift):(1 + row_shift + n_rows), (1 + col_shift):(1 + col_shift + n_cols)]
+		neighbors[:, d] = shifted[is_seat]
+	return neighbors
+
+
+class SeatSimulation:
+	# steps the seats until they settle; a seat fills up when at most `lonely` of its neighbors are taken,
+	# and empties when at least `crowded` are. neighbors are adjacent seats, or the first visible seats.
+	# only seats that changed last step, and their neighbors, can change next step, so only those are checked
+	def __init__(self, seats: np.ndarray, visible: bool = False, crowded: int = None, lonely: int = 0):
+		self.seats = seats
+		if visible:
+			self.neighbors = build_visible_neighbors(seats)
+		else:
+			self.neighbors = build_adjacent_neighbors(seats)
+		if crowded is None:
+			crowded = CROWDED_VISIBLE if visible else CROWDED_ADJACENT
+		self.crowded = crowded
+		self.lonely = lonely
+		n_seats = len(self.neighbors)
+		# NO_SEAT neighbors point at an extra seat at the end instead, which always stays empty
+		self.neighbor_slots = np.where(self.neighbors == NO_SEAT, n_seats, self.neighbors)
+		# two buffers, swapped every step
+		self.current = np.zeros(n_seats + 1, dtype=bool)
+		self.current[:n_seats] = (seats[seats != FLOOR] == SEAT_OCCUPIED)
+		self.next = self.current.copy()
+		self.frontier = None  # seats that might change next step, or None for every seat
+		self.frontier_mark = np.zeros(n_seats + 1, dtype=bool)
+		self.last_changed = np.empty(0, dtype=np.int64)
+
+	def step(self) -> int:
+		# returns how many seats changed
+		n_seats = len(self.neighbors)
+		if self.frontier is None:
+			occupied = self.current[:-1]
+			counts = np.count_nonzero(self.current[self.neighbor_slots], axis=1)
+			new_occupied = np.where(occupied, counts < self.crowded, counts <= self.lonely)
+			changed = np.flatnonzero(new_occupied != occupied)
+			self.next[:-1] = new_occupied
+		else:
+			active = self.frontier
+			occupied = self.current[active]
+			counts = np.count_nonzero(self.current[self.neighbor_slots[active]], axis=1)
+			new_occupied = np.where(occupied, counts < self.crowded, counts <= self.lonely)
+			changed = active[new_occupied != occupied]
+			# next still holds the state from two steps ago, which only differs where seats changed last step
+			self.next[self.last_changed] = self.current[self.last_changed]
+			self.next[changed] = ~self.current[changed]
+		self.current, self.next = self.next, self.current
+		self.last_changed = changed
+		# the seats that changed and their neighbors are the only ones that can change next;
+		# past a certain share of the seats it's cheaper to just look at all of them again
+		self.frontier = None
+		if len(changed) <= FULL_STEP_SHARE * n_seats:
+			changed_slots = self.neighbor_slots[changed]
+			self.frontier_mark[changed] = True
+			self.frontier_mark[changed_slots] = True
+			frontier = np.flatnonzero(self.frontier_mark[:-1])
+			self.frontier_mark[changed_slots] = False
+			self.frontier_mark[changed] = False
+			if len(frontier) <= FULL_STEP_SHARE * n_seats:
+				self.frontier = frontier
+		return len(changed)
+
+	def run(self) -> int:
+		# returns how many steps it took, counting the last step where nothing changed
+		time_step_count = 1
+		while self.step() > 0:
+			time_step_count += 1
+		return time_step_count
+
+	def occupied_count(self) -> int:
+		return int(np.count_nonzero(self.current[:-1]))
+
+	def to_grid(self) -> np.ndarray:
+		grid = np.full(self.seats.shape, FLOOR, dtype=self.seats.dtype)
+		grid[self.seats != FLOOR] = np.where(self.current[:-1], SEAT_OCCUPIED, SEAT_EMPTY)
+		return grid
+
+
 if __name__ == "__main__":
 	seat_array = read_input_file()
-	time_step_count = 0
-	repeat = True
-	while repeat:
-		new_seat_array = advance_time(seat_array)
-		time_step_count += 1
-		repeat = (not np.array_equal(seat_array, new_seat_array))
-		seat_array = new_seat_array
-	occupied_count = np.count_nonzero(seat_array == SEAT_OCCUPIED)
+	simulation = SeatSimulation(seat_array, visible=True)
+	time_step_count = simulation.run()
+	occupied_count = simulation.occupied_count()
 	print(f"{time_step_count} time steps passed")
 	print("number of occupied seats after things settle down:", occupied_count)
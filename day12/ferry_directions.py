@@ -1,8 +1,22 @@
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+import numpy as np
 from constants import UTF_8
+from int_loading import BYTE_KINDS, BYTE_SPACE, parse_int_bytes
 
 
 INPUT_FILE_NAME = "ferry_directions.txt"
+# the state is the column vector (x, y, waypoint_x, waypoint_y, 1), and every block of instructions is a 5x5 integer matrix on it
+X, Y, WAYPOINT_X, WAYPOINT_Y, ONE = range(5)
+STATE_SIZE = 5
+START_STATE = np.array([0, 0, 10, 1, 1], dtype=np.int64)
+NORTH, SOUTH, EAST, WEST, LEFT, RIGHT, FORWARD = range(7)
+ACTION_CODES = {"N": NORTH, "S": SOUTH, "E": EAST, "W": WEST, "L": LEFT, "R": RIGHT, "F": FORWARD}
+NO_ACTION = -1
+ACTION_BYTE_CODES = np.full(256, NO_ACTION, dtype=np.int64)
+ACTION_BYTE_CODES[[ord(action) for action in ACTION_CODES]] = list(ACTION_CODES.values())
+QUARTER_TURN_COS = np.array([1, 0, -1, 0], dtype=np.int64)
+QUARTER_TURN_SIN = np.array([0, 1, 0, -1], dtype=np.int64)
+BLOCK_SIZE = 2 ** 16  # instructions handled at a time, to keep memory bounded
 
 
 class Boat:
@@ -72,10 +86,110 @@ def follow_instruction(action: str, value: int, boat: Boat):
 	return
 
 
+def action_code(action: str) -> int:
+	if action not in ACTION_CODES:
+		raise ValueError(f"Unknown action type: {action}")
+	return ACTION_CODES[action]
+
+
+def encode_instructions(instructions: List[Tuple[str, int]]) -> Tuple[np.ndarray, np.ndarray]:
+	# (action codes, values), one entry per instruction
+	codes = np.array([action_code(action) for action, _ in instructions], dtype=np.int64)
+	values = np.array([value for _, value in instructions], dtype=np.int64)
+	return codes, values
+
+
+def read_instruction_arrays() -> Tuple[np.ndarray, np.ndarray]:
+	# the same as encode_instructions(read_input_file()), without a tuple per instruction
+	buffer = np.fromfile(INPUT_FILE_NAME, dtype=np.uint8)
+	is_space = (BYTE_KINDS[buffer] == BYTE_SPACE)
+	line_starts = np.flatnonzero(~is_space & np.concatenate(([True], is_space[:-1])))
+	codes = ACTION_BYTE_CODES[buffer[line_starts]]
+	if np.any(codes == NO_ACTION):
+		bad_action = chr(buffer[line_starts[np.flatnonzero(codes == NO_ACTION)[0]]])
+		raise ValueError(f"Unknown action type: {bad_action}")
+	# with the actions blanked out, what's left is one number per line
+	buffer[line_starts] = ord(" ")
+	values = parse_int_bytes(buffer)
+	if len(values) != len(codes):
+		raise ValueError("every instruction needs exactly one number")
+	return codes, values
+
+
+def waypoint_offsets(codes: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+	# after each instruction, the waypoint is the starting waypoint plus (offset_x, offset_y),
+	# all turned left by the quarter turns so far; returns (cos, sin, offset_x, offset_y) of that
+	turning = (codes == LEFT) | (codes == RIGHT)
+	if np.any(values[turning] % 90 != 0):
+		raise ValueError("turns have to be multiples of 90 degrees")
+	# a right turn is a left turn the other way
+	quarter_turns = np.cumsum(np.where(codes == LEFT, values, 0) - np.where(codes == RIGHT, values, 0)) // 90 % 4
+	cos = QUARTER_TURN_COS[quarter_turns]
+	sin = QUARTER_TURN_SIN[quarter_turns]
+	move_x = np.where(codes == EAST, values, 0) - np.where(codes == WEST, values, 0)
+	move_y = np.where(codes == NORTH, values, 0) - np.where(codes == SOUTH, values, 0)
+	# turn every move back by the quarter turns so far, so the moves can just be added up
+	offset_x = np.cumsum(cos * move_x + sin * move_y)
+	offset_y = np.cumsum(cos * move_y - sin * move_x)
+	return cos, sin, offset_x, offset_y
+
+
+def block_matrix(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+	# the single matrix for following every instruction in order
+	matrix = np.eye(STATE_SIZE, dtype=np.int64)
+	if len(codes) == 0:
+		return matrix
+	cos, sin, offset_x, offset_y = waypoint_offsets(codes, values)
+	# going forward v moves the boat by v times the waypoint at that point
+	steps = np.where(codes == FORWARD, values, 0)
+	steps_cos = np.sum(steps * cos)
+	steps_sin = np.sum(steps * sin)
+	matrix[X, WAYPOINT_X] = steps_cos
+	matrix[X, WAYPOINT_Y] = -steps_sin
+	matrix[Y, WAYPOINT_X] = steps_sin
+	matrix[Y, WAYPOINT_Y] = steps_cos
+	matrix[X, ONE] = np.sum(steps * (cos * offset_x - sin * offset_y))
+	matrix[Y, ONE] = np.sum(steps * (sin * offset_x + cos * offset_y))
+	matrix[WAYPOINT_X, WAYPOINT_X] = cos[-1]
+	matrix[WAYPOINT_X, WAYPOINT_Y] = -sin[-1]
+	matrix[WAYPOINT_Y, WAYPOINT_X] = sin[-1]
+	matrix[WAYPOINT_Y, WAYPOINT_Y] = cos[-1]
+	matrix[WAYPOINT_X, ONE] = cos[-1] * offset_x[-1] - sin[-1] * offset_y[-1]
+	matrix[WAYPOINT_Y, ONE] = sin[-1] * offset_x[-1] + cos[-1] * offset_y[-1]
+	return matrix
+
+
+def final_state(codes: np.ndarray, values: np.ndarray, start_state: np.ndarray = START_STATE) -> np.ndarray:
+	state = start_state.copy()
+	for block_start in range(0, len(codes), BLOCK_SIZE):
+		block = slice(block_start, block_start + BLOCK_SIZE)
+		state = block_matrix(codes[block], values[block]) @ state
+	return state
+
+
+def iter_states(codes: np.ndarray, values: np.ndarray, start_state: np.ndarray = START_STATE) -> Iterator[np.ndarray]:
+	# every state after each instruction, as one (instructions, STATE_SIZE) array per block
+	state = start_state.copy()
+	for block_start in range(0, len(codes), BLOCK_SIZE):
+		block = slice(block_start, block_start + BLOCK_SIZE)
+		cos, sin, offset_x, offset_y = waypoint_offsets(codes[block], values[block])
+		waypoint_x = state[WAYPOINT_X] + offset_x
+		waypoint_y = state[WAYPOINT_Y] + offset_y
+		states = np.empty((len(cos), STATE_SIZE), dtype=np.int64)
+		states[:, WAYPOINT_X] = cos * waypoint_x - sin * waypoint_y
+		states[:, WAYPOINT_Y] = sin * waypoint_x + cos * waypoint_y
+		steps = np.where(codes[block] == FORWARD, values[block], 0)
+		states[:, X] = state[X] + np.cumsum(steps * states[:, WAYPOINT_X])
+		states[:, Y] = state[Y] + np.cumsum(steps * states[:, WAYPOINT_Y])
+		states[:, ONE] = 1
+		state = states[-1]
+		yield states
+
+
 if __name__ == "__main__":
-	all_instructions = read_input_file()
-	b = Boat()
-	for a_str, a_num in all_instructions:
-		follow_instruction(a_str, a_num, b)
-	print(f"boat ending location: ({b.x},{b.y})")
-	print(f"manhattan distance from origin:", abs(b.x) + abs(b.y))
+	all_codes, all_values = read_instruction_arrays()
+	end_state = final_state(all_codes, all_values)
+	x = int(end_state[X])
+	y = int(end_state[Y])
+	print(f"boat ending location: ({x},{y})")
+	print(f"manhattan distance from origin:", abs(x) + abs(y))
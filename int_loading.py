@@ -0,0 +1,69 @@
+from typing import Iterator
+import numpy as np
+from record_reading import iter_line_chunks
+
+
+CHUNK_BYTES = 8 * 1024 * 1024  # keeps the parser's temporary arrays to a few hundred MB at most
+MINUS_SIGN = ord("-")
+ZERO = ord("0")
+NINE = ord("9")
+MAX_DIGITS = 19  # the most digits an int64 can have
+INT64_MAX = np.uint64(np.iinfo(np.int64).max)
+
+# what every possible byte is; anything that isn't a digit, a minus sign or whitespace is an error
+BYTE_INVALID = 0
+BYTE_SPACE = 1
+BYTE_DIGIT = 2
+BYTE_MINUS = 3
+BYTE_KINDS = np.zeros(256, dtype=np.uint8)
+BYTE_KINDS[list(b" \t\n\v\f\r")] = BYTE_SPACE
+BYTE_KINDS[ZERO:(NINE + 1)] = BYTE_DIGIT
+BYTE_KINDS[MINUS_SIGN] = BYTE_MINUS
+
+
+def parse_int_bytes(buffer: np.ndarray) -> np.ndarray:
+	# whitespace-separated numbers, each an optional minus sign followed by a run of digits
+	kinds = BYTE_KINDS[buffer]
+	bad_positions = np.flatnonzero(kinds == BYTE_INVALID)
+	if len(bad_positions) > 0:
+		raise ValueError(f"unexpected byte {bytes(buffer[bad_positions[:1]])!r} at offset {bad_positions[0]}")
+	is_digit = np.concatenate(([False], kinds == BYTE_DIGIT, [False]))
+	minus_positions = np.flatnonzero(kinds == BYTE_MINUS)
+	# a minus sign has to start a number and be followed by its digits
+	starts_number = (minus_positions == 0) | (kinds[np.maximum(minus_positions - 1, 0)] == BYTE_SPACE)
+	if not np.all(starts_number & is_digit[minus_positions + 2]):
+		raise ValueError("minus sign that isn't right before a number")
+	run_edges = np.flatnonzero(is_digit[1:] != is_digit[:-1])
+	run_starts = run_edges[0::2]
+	run_lengths = run_edges[1::2] - run_starts
+	if len(run_starts) == 0:
+		return np.empty(0, dtype=np.int64)
+	max_length = int(np.max(run_lengths))
+	if max_length > MAX_DIGITS:
+		raise ValueError("number too long to fit in an int64")
+	# one digit of every number at a time; 19 digits always fit in a uint64
+	numbers = np.zeros(len(run_starts), dtype=np.uint64)
+	for digit_index in range(max_length):
+		in_run = (digit_index < run_lengths)
+		digits = buffer[np.minimum(run_starts + digit_index, len(buffer) - 1)] - ZERO
+		numbers = np.where(in_run, numbers * 10 + digits, numbers)
+	negative = (run_starts > 0) & (buffer[np.maximum(run_starts - 1, 0)] == MINUS_SIGN)
+	# -(INT64_MAX + 1) still fits, so negative numbers can be one bigger
+	if np.any(numbers > INT64_MAX + negative):
+		raise ValueError("number too big to fit in an int64")
+	numbers = numbers.view(np.int64)
+	np.negative(numbers, out=numbers, where=negative)
+	return numbers
+
+
+def read_int_array(file_name: str) -> np.ndarray:
+	chunks = list(iter_int_chunks(file_name))
+	if len(chunks) == 0:
+		return np.empty(0, dtype=np.int64)
+	return np.concatenate(chunks)
+
+
+def iter_int_chunks(file_name: str, chunk_bytes: int = CHUNK_BYTES) -> Iterator[np.ndarray]:
+	# whole lines at a time, so no number gets cut in half
+	for chunk in iter_line_chunks(file_name, chunk_bytes):
+		yield parse_int_bytes(np.frombuffer(chunk, dtype=np.uint8))
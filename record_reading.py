@@ -0,0 +1,81 @@
+import mmap
+from typing import Iterator, List
+from constants import UTF_8
+
+
+LINE_ENDS = [b"\n"]
+BLANK_LINES = [b"\n\n", b"\n\r\n"]
+
+
+def iter_lines(file_name: str, memory_mapped: bool = False) -> Iterator[str]:
+	if not memory_mapped:
+		with open(file_name, "r", encoding=UTF_8) as in_file:
+			yield from in_file
+		return
+	with open(file_name, "rb") as in_file:
+		if in_file.seek(0, 2) == 0:
+			return  # mmap can't map an empty file
+		with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+			for line in iter(mapped.readline, b""):
+				yield line.decode(UTF_8)
+
+
+def iter_records(file_name: str, memory_mapped: bool = False) -> Iterator[str]:
+	# records are separated by blank lines; each one comes back as its lines joined by "\n"
+	record_lines = list()
+	for line_ in iter_lines(file_name, memory_mapped):
+		line = line_.rstrip("\r\n")
+		if line == "":
+			if len(record_lines) > 0:
+				yield "\n".join(record_lines)
+				record_lines = list()
+		else:
+			record_lines.append(line)
+	if len(record_lines) > 0:
+		yield "\n".join(record_lines)
+
+
+def find_separator_end(mapped: mmap.mmap, separators: List[bytes], start: int, end: int, last: bool) -> int:
+	# just past the first (or last) separator in mapped[start:end], or -1 if there isn't one
+	ends = list()
+	for separator in separators:
+		position = mapped.rfind(separator, start, end) if last else mapped.find(separator, start, end)
+		if position != -1:
+			ends.append(position + len(separator))
+	if len(ends) == 0:
+		return -1
+	return max(ends) if last else min(ends)
+
+
+def iter_chunks(file_name: str, chunk_bytes: int, separators: List[bytes]) -> Iterator[bytes]:
+	# about chunk_bytes of the file at a time, always ending right after one of the separators
+	# (or at the end of the file), so nothing between two separators gets cut in half
+	with open(file_name, "rb") as in_file:
+		file_size = in_file.seek(0, 2)
+		if file_size == 0:
+			return  # mmap can't map an empty file
+		with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+			start = 0
+			while start < file_size:
+				end = min(start + chunk_bytes, file_size)
+				if end < file_size:
+					chunk_end = find_separator_end(mapped, separators, start, end, last=True)
+					if chunk_end == -1:
+						# nothing to cut at yet, so run on to the next separator, even one that straddles end
+						search_start = max(start, end - max(len(separator) for separator in separators) + 1)
+						chunk_end = find_separator_end(mapped, separators, search_start, file_size, last=False)
+						if chunk_end == -1:
+							chunk_end = file_size
+					end = chunk_end
+				# a copy, so nothing holds a view into the mmap when it closes
+				yield mapped[start:end]
+				start = end
+
+
+def iter_line_chunks(file_name: str, chunk_bytes: int) -> Iterator[bytes]:
+	return iter_chunks(file_name, chunk_bytes, LINE_ENDS)
+
+
+def iter_record_chunks(file_name: str, chunk_bytes: int) -> Iterator[bytes]:
+	# chunks of whole records, the same records iter_records splits on blank lines
+	return iter_chunks(file_name, chunk_bytes, BLANK_LINES)